@@ -10,27 +10,25 @@ from pathlib import Path
 
 def check_dependencies():
     """检查必要的依赖"""
-    required_modules = [
-        'nicegui',
-        'PIL',
-        'piexif',
-        'gpxpy',
-        'pandas',
-        'python-dateutil'
+    import importlib.util
+
+    # 包名 -> 实际导入名
+    required_modules = {
+        'nicegui': 'nicegui',
+        'PIL': 'PIL',
+        'piexif': 'piexif',
+        'gpxpy': 'gpxpy',
+        'pandas': 'pandas',
+        'python-dateutil': 'dateutil'
+    }
+
+    # find_spec只查找模块是否可导入，不会真正执行导入，
+    # 避免启动时就把pandas等重量级模块加载进来
+    missing = [
+        package for package, module in required_modules.items()
+        if importlib.util.find_spec(module) is None
     ]
     
-    missing = []
-    for module in required_modules:
-        try:
-            if module == 'PIL':
-                __import__('PIL')
-            elif module == 'python-dateutil':
-                __import__('dateutil')
-            else:
-                __import__(module)
-        except ImportError:
-            missing.append(module)
-    
     if missing:
         print("❌ 缺少以下依赖包：")
         for module in missing:
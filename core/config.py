@@ -2,10 +2,31 @@
 配置管理模块
 处理应用配置的保存和加载
 """
-import json
+import atexit
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+# 优先使用orjson（C实现，序列化/反序列化快数倍且直接产出bytes），
+# 未安装时回退到标准库json，行为保持一致
+try:
+    import orjson
+
+    def _loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+except ImportError:
+    import json
+
+    def _loads(data: bytes) -> Any:
+        return json.loads(data.decode('utf-8'))
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
 
 class ConfigManager:
     """配置管理器"""
@@ -19,6 +40,12 @@ class ConfigManager:
         """
         self.config_file = Path(config_file)
         self.config: Dict[str, Any] = {}
+        # 写入去抖：set/update只标记脏并安排延迟写盘，
+        # 连续的配置修改合并为一次磁盘写入
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
     
     def load(self) -> Dict[str, Any]:
         """
@@ -29,8 +56,7 @@ class ConfigManager:
         """
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    self.config = json.load(f)
+                self.config = _loads(self.config_file.read_bytes())
                 return self.config
             except Exception:
                 # 配置文件损坏，返回空配置
@@ -53,11 +79,37 @@ class ConfigManager:
         """
         try:
             self.config = config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            self.config_file.write_bytes(_dumps(config))
+            self._dirty = False
             return True
         except Exception:
             return False
+
+    def flush(self) -> bool:
+        """
+        立即写出待保存的配置（去抖定时器到期或进程退出时调用）
+
+        Returns:
+            是否保存成功（无待写内容时返回True）
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return True
+        return self.save(self.config)
+
+    def _schedule_flush(self, delay: float = 0.2):
+        """安排一次延迟写盘，新的修改会重置计时器"""
+        with self._lock:
+            self._dirty = True
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            timer = threading.Timer(delay, self.flush)
+            timer.daemon = True
+            self._flush_timer = timer
+            timer.start()
     
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -81,10 +133,11 @@ class ConfigManager:
             value: 配置值
             
         Returns:
-            是否保存成功
+            是否已接受修改（实际写盘经过去抖合并）
         """
         self.config[key] = value
-        return self.save(self.config)
+        self._schedule_flush()
+        return True
     
     def update(self, config: Dict[str, Any]) -> bool:
         """
@@ -94,10 +147,11 @@ class ConfigManager:
             config: 配置字典
             
         Returns:
-            是否保存成功
+            是否已接受修改（实际写盘经过去抖合并）
         """
         self.config.update(config)
-        return self.save(self.config)
+        self._schedule_flush()
+        return True
 
 
 # 全局配置管理器实例
@@ -2,8 +2,12 @@
 EXIF 读写模块
 读取照片的GPS信息和拍摄时间，写入GPS信息到照片
 """
+import functools
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
 import piexif
 from PIL import Image
@@ -17,6 +21,60 @@ Image.MAX_IMAGE_PIXELS = 200000000
 # warnings.filterwarnings('ignore', category=Image.DecompressionBombWarning)
 
 
+# 读取EXIF时只取文件头部，避免为了元数据读入整张照片
+# （APP1段位于JPEG起始处，128KB足以覆盖绝大多数照片的EXIF）
+_EXIF_HEAD_BYTES = 131072
+
+# GPS标签ID和方向引用（模块级常量，省去批量写入时的逐次属性查找）
+_GPS_LAT_REF = piexif.GPSIFD.GPSLatitudeRef
+_GPS_LAT = piexif.GPSIFD.GPSLatitude
+_GPS_LON_REF = piexif.GPSIFD.GPSLongitudeRef
+_GPS_LON = piexif.GPSIFD.GPSLongitude
+_REF_N = b'N'
+_REF_S = b'S'
+_REF_E = b'E'
+_REF_W = b'W'
+
+# 拍摄时间标签的回退链（优先级从高到低）
+_DT_TAG_CHAIN = (
+    ('Exif', piexif.ExifIFD.DateTimeOriginal),    # 36867
+    ('Exif', piexif.ExifIFD.DateTimeDigitized),   # 36868
+    ('0th', piexif.ImageIFD.DateTime),            # 306
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _load_exif_cached(path: str, mtime_ns: int, size: int) -> dict:
+    """
+    加载EXIF字典并按 (路径, 修改时间, 大小) 缓存
+
+    扫描和写入阶段会对同一张照片各做一次完整的EXIF解析，
+    缓存可以省掉第二次。文件被修改后mtime变化，缓存自动失效。
+    对JPEG只读取头部字节解析，EXIF跨出头部时回退到完整读取。
+    注意：返回的字典是共享的，调用方修改前必须先复制。
+    """
+    with open(path, 'rb') as f:
+        head = f.read(_EXIF_HEAD_BYTES)
+
+    if head[:2] == b'\xff\xd8' and size > len(head):
+        try:
+            return piexif.load(head)
+        except Exception:
+            # APP1段超出头部范围，回退到完整文件解析
+            pass
+    elif head[:2] == b'\xff\xd8':
+        # 整个文件已经在head里
+        return piexif.load(head)
+
+    return piexif.load(path)
+
+
+def _load_exif(image_path: str) -> dict:
+    """读取照片EXIF（带缓存），返回共享字典，调用方不得直接修改"""
+    st = os.stat(image_path)
+    return _load_exif_cached(str(image_path), st.st_mtime_ns, st.st_size)
+
+
 def read_exif_info(image_path: str) -> Tuple[bool, Optional[datetime]]:
     """
     读取照片的GPS信息和拍摄时间
@@ -42,8 +100,8 @@ def read_exif_info(image_path: str) -> Tuple[bool, Optional[datetime]]:
         raise ValueError(f"路径不是文件: {image_path}")
     
     try:
-        exif_dict = piexif.load(str(image_path))
-        
+        exif_dict = _load_exif(str(image_path))
+
         # 检查是否有GPS信息
         # GPS信息需要包含经纬度
         has_gps = False
@@ -58,39 +116,19 @@ def read_exif_info(image_path: str) -> Tuple[bool, Optional[datetime]]:
         
         # 读取拍摄时间（多级回退：DateTimeOriginal -> DateTimeDigitized -> DateTime）
         datetime_utc = None
-        if 'Exif' in exif_dict:
-            exif = exif_dict['Exif']
-            # DateTimeOriginal (36867) - 优先使用
-            if piexif.ExifIFD.DateTimeOriginal in exif:
-                try:
-                    dt_str = exif[piexif.ExifIFD.DateTimeOriginal]
-                    if isinstance(dt_str, bytes):
-                        dt_str = dt_str.decode('utf-8')
-                    datetime_utc = _parse_exif_datetime(dt_str)
-                except Exception:
-                    pass
-            
-            # DateTimeDigitized (36868) - 如果DateTimeOriginal不存在
-            if datetime_utc is None and piexif.ExifIFD.DateTimeDigitized in exif:
-                try:
-                    dt_str = exif[piexif.ExifIFD.DateTimeDigitized]
-                    if isinstance(dt_str, bytes):
-                        dt_str = dt_str.decode('utf-8')
-                    datetime_utc = _parse_exif_datetime(dt_str)
-                except Exception:
-                    pass
-        
-        # 如果Exif中没有，尝试0th IFD中的DateTime (306)
-        if datetime_utc is None and '0th' in exif_dict:
-            if piexif.ImageIFD.DateTime in exif_dict['0th']:
-                try:
-                    dt_str = exif_dict['0th'][piexif.ImageIFD.DateTime]
-                    if isinstance(dt_str, bytes):
-                        dt_str = dt_str.decode('utf-8')
-                    datetime_utc = _parse_exif_datetime(dt_str)
-                except Exception:
-                    pass
-        
+        for section, tag in _DT_TAG_CHAIN:
+            dt_str = exif_dict.get(section, {}).get(tag)
+            if not dt_str:
+                continue
+            try:
+                if isinstance(dt_str, bytes):
+                    dt_str = dt_str.decode('utf-8')
+                datetime_utc = _parse_exif_datetime(dt_str)
+            except Exception:
+                continue
+            if datetime_utc is not None:
+                break
+
         return has_gps, datetime_utc
         
     except piexif.InvalidImageDataError:
@@ -101,20 +139,112 @@ def read_exif_info(image_path: str) -> Tuple[bool, Optional[datetime]]:
         return False, None
 
 
+def read_exif_info_batch(
+    paths: List[str],
+    max_workers: Optional[int] = None
+) -> List[Tuple[bool, Optional[datetime]]]:
+    """
+    批量读取多张照片的GPS信息和拍摄时间
+
+    EXIF读取以文件I/O为主，用线程池让多张照片的磁盘延迟相互重叠。
+    结果顺序与输入路径顺序一致。
+
+    Args:
+        paths: 照片路径列表
+        max_workers: 最大线程数，默认为 min(32, CPU核数*4)
+
+    Returns:
+        与paths等长的 (has_gps, datetime_utc) 列表，
+        单张照片读取失败时对应项为 (False, None)
+    """
+    if not paths:
+        return []
+
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 4) * 4)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_safe_read_exif, paths))
+
+
+def _safe_read_exif(path: str) -> Tuple[bool, Optional[datetime]]:
+    """read_exif_info的异常安全包装（线程池/进程池任务用）"""
+    try:
+        return read_exif_info(path)
+    except Exception:
+        return False, None
+
+
 def _parse_exif_datetime(dt_str: str) -> Optional[datetime]:
     """
     解析EXIF时间字符串为UTC datetime
     EXIF时间格式通常是 "YYYY:MM:DD HH:MM:SS"（本地时间）
     这里先返回naive datetime，后续在匹配时根据时区转换
+
+    EXIF时间是固定19字节布局，按切片手工解析比strptime
+    （每次调用都要解释格式串）快约一个数量级。
     """
     try:
         # EXIF格式: "YYYY:MM:DD HH:MM:SS"
-        dt = datetime.strptime(dt_str, "%Y:%m:%d %H:%M:%S")
-        return dt
+        return datetime(
+            int(dt_str[0:4]), int(dt_str[5:7]), int(dt_str[8:10]),
+            int(dt_str[11:13]), int(dt_str[14:16]), int(dt_str[17:19])
+        )
     except Exception:
         return None
 
 
+def _build_gps_exif_bytes(src_path: str, lat: float, lon: float) -> bytes:
+    """
+    读取照片现有EXIF、替换GPS段并dump为字节
+
+    Args:
+        src_path: 源照片路径
+        lat: 纬度（-90到90）
+        lon: 经度（-180到180）
+
+    Returns:
+        可直接交给piexif.insert/PIL的EXIF字节串
+    """
+    # 读取现有EXIF（如果文件没有EXIF，会返回空字典）
+    # 缓存返回的字典是共享的，浅复制后再覆盖GPS段
+    try:
+        exif_dict = dict(_load_exif(src_path))
+    except piexif.InvalidImageDataError:
+        # 文件没有EXIF或EXIF损坏，创建新的EXIF字典
+        exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
+    except Exception:
+        # 其他错误，也创建新的EXIF字典
+        exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
+
+    # 准备GPS数据
+    # GPS纬度：度分秒格式
+    lat_ref = _REF_N if lat >= 0 else _REF_S
+    lat_deg = abs(lat)
+    lat_d = int(lat_deg)
+    lat_m = int((lat_deg - lat_d) * 60)
+    lat_s = ((lat_deg - lat_d) * 60 - lat_m) * 60
+
+    # GPS经度：度分秒格式
+    lon_ref = _REF_E if lon >= 0 else _REF_W
+    lon_deg = abs(lon)
+    lon_d = int(lon_deg)
+    lon_m = int((lon_deg - lon_d) * 60)
+    lon_s = ((lon_deg - lon_d) * 60 - lon_m) * 60
+
+    # 构建GPS字典
+    gps_ifd = {
+        _GPS_LAT_REF: lat_ref,
+        _GPS_LAT: ((lat_d, 1), (lat_m, 1), (int(lat_s * 1000), 1000)),
+        _GPS_LON_REF: lon_ref,
+        _GPS_LON: ((lon_d, 1), (lon_m, 1), (int(lon_s * 1000), 1000)),
+    }
+
+    exif_dict['GPS'] = gps_ifd
+
+    return piexif.dump(exif_dict)
+
+
 def write_gps_to_copy(src_path: str, dst_path: str, lat: float, lon: float) -> bool:
     """
     将GPS信息写入照片副本
@@ -156,51 +286,39 @@ def write_gps_to_copy(src_path: str, dst_path: str, lat: float, lon: float) -> b
         raise ValueError(f"目标路径无效: {dst_path}, 错误: {e}")
     
     try:
-        # 读取现有EXIF（如果文件没有EXIF，会返回空字典）
-        try:
-            exif_dict = piexif.load(str(src_path))
-        except piexif.InvalidImageDataError:
-            # 文件没有EXIF或EXIF损坏，创建新的EXIF字典
-            exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
-        except Exception:
-            # 其他错误，也创建新的EXIF字典
-            exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
-        
-        # 准备GPS数据
-        # GPS纬度：度分秒格式
-        lat_ref = 'N' if lat >= 0 else 'S'
-        lat_deg = abs(lat)
-        lat_d = int(lat_deg)
-        lat_m = int((lat_deg - lat_d) * 60)
-        lat_s = ((lat_deg - lat_d) * 60 - lat_m) * 60
-        
-        # GPS经度：度分秒格式
-        lon_ref = 'E' if lon >= 0 else 'W'
-        lon_deg = abs(lon)
-        lon_d = int(lon_deg)
-        lon_m = int((lon_deg - lon_d) * 60)
-        lon_s = ((lon_deg - lon_d) * 60 - lon_m) * 60
-        
-        # 构建GPS字典
-        gps_ifd = {
-            piexif.GPSIFD.GPSLatitudeRef: lat_ref.encode('ascii'),
-            piexif.GPSIFD.GPSLatitude: ((lat_d, 1), (lat_m, 1), (int(lat_s * 1000), 1000)),
-            piexif.GPSIFD.GPSLongitudeRef: lon_ref.encode('ascii'),
-            piexif.GPSIFD.GPSLongitude: ((lon_d, 1), (lon_m, 1), (int(lon_s * 1000), 1000)),
-        }
-        
-        exif_dict['GPS'] = gps_ifd
-        
-        # 将EXIF数据转换为字节
-        exif_bytes = piexif.dump(exif_dict)
-        
-        # 复制图片并写入EXIF
+        # 读取现有EXIF并替换GPS段
+        exif_bytes = _build_gps_exif_bytes(str(src_path), lat, lon)
+
+        # JPEG快路径：复制原始字节后只重写APP1段，
+        # 不解码像素、不重新编码，输出无损且快一个数量级
+        with open(src_path, 'rb') as f:
+            magic = f.read(2)
+
+        if magic == b'\xff\xd8':
+            try:
+                shutil.copyfile(src_path, dst_path)
+                piexif.insert(exif_bytes, str(dst_path))
+                return True
+            except Exception:
+                # 快路径失败（如JPEG结构异常），清理后走PIL重编码
+                Path(dst_path).unlink(missing_ok=True)
+
+        # 非JPEG或快路径失败：用PIL解码并重新编码
         try:
             img = Image.open(src_path)
+            # JPEG源且无需模式转换时，quality='keep'复用原量化表，
+            # 免去重新做DCT量化决策且不损失画质
+            keep_jpeg = img.format == 'JPEG'
             # 确保图片是RGB模式（某些格式需要转换）
             if img.mode not in ('RGB', 'L'):
                 img = img.convert('RGB')
-            img.save(dst_path, exif=exif_bytes, quality=95)
+                # 转换后不再是JpegImageFile，原量化表不可复用
+                keep_jpeg = False
+            if keep_jpeg:
+                img.save(dst_path, format='JPEG', exif=exif_bytes,
+                         quality='keep', subsampling='keep')
+            else:
+                img.save(dst_path, exif=exif_bytes, quality=95)
             return True
         except Exception as e:
             # 图片格式不支持或保存失败
@@ -214,6 +332,39 @@ def write_gps_to_copy(src_path: str, dst_path: str, lat: float, lon: float) -> b
         return False
 
 
+def write_gps_batch(
+    items: List[Tuple[str, str, float, float]],
+    max_workers: int = 8
+) -> List[bool]:
+    """
+    批量将GPS信息写入多张照片副本
+
+    JPEG快路径下写入以复制文件和重写APP1段为主（I/O密集），
+    用线程池让多张照片的写入并发进行。结果顺序与输入一致。
+
+    Args:
+        items: (src_path, dst_path, lat, lon) 元组列表
+        max_workers: 最大线程数
+
+    Returns:
+        与items等长的布尔列表，表示每张照片是否写入成功
+    """
+    if not items:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_write_one_copy, items))
+
+
+def _write_one_copy(item: Tuple[str, str, float, float]) -> bool:
+    """write_gps_to_copy的元组参数包装（模块级定义，便于进程池分发）"""
+    src_path, dst_path, lat, lon = item
+    try:
+        return write_gps_to_copy(src_path, dst_path, lat, lon)
+    except Exception:
+        return False
+
+
 def write_gps_inplace(image_path: str, lat: float, lon: float) -> bool:
     """
     直接修改照片文件，写入GPS信息（覆盖原文件）
@@ -231,20 +382,46 @@ def write_gps_inplace(image_path: str, lat: float, lon: float) -> bool:
         ValueError: 经纬度超出范围或路径无效
         PermissionError: 无写权限
     """
-    # 使用临时文件方式：先写入临时文件，成功后替换原文件
+    # 验证经纬度范围
+    if not (-90.0 <= lat <= 90.0):
+        raise ValueError(f"纬度超出有效范围 [-90, 90]: {lat}")
+    if not (-180.0 <= lon <= 180.0):
+        raise ValueError(f"经度超出有效范围 [-180, 180]: {lon}")
+
+    # 检查文件
+    path = Path(image_path)
+    if not path.exists():
+        raise FileNotFoundError(f"照片文件不存在: {image_path}")
+    if not path.is_file():
+        raise ValueError(f"路径不是文件: {image_path}")
+
+    # JPEG快路径：piexif.insert直接在原文件上重写APP1段，
+    # 不需要临时文件副本，也不触碰像素数据
+    with open(image_path, 'rb') as f:
+        magic = f.read(2)
+
+    if magic == b'\xff\xd8':
+        try:
+            exif_bytes = _build_gps_exif_bytes(str(image_path), lat, lon)
+            piexif.insert(exif_bytes, str(image_path))
+            return True
+        except PermissionError:
+            raise
+        except Exception:
+            return False
+
+    # 非JPEG：临时文件方式，先写入临时文件，成功后替换原文件
     import tempfile
-    import shutil
-    
+
     # 创建临时文件
-    temp_fd, temp_path = tempfile.mkstemp(suffix='.jpg', dir=Path(image_path).parent)
+    temp_fd, temp_path = tempfile.mkstemp(suffix='.jpg', dir=path.parent)
     try:
         # 关闭文件描述符
-        import os
         os.close(temp_fd)
-        
+
         # 写入临时文件
         success = write_gps_to_copy(image_path, temp_path, lat, lon)
-        
+
         if success:
             # 替换原文件
             shutil.move(temp_path, image_path)
@@ -2,12 +2,15 @@
 匹配算法模块
 根据时间将照片与轨迹点进行匹配
 """
-import bisect
 import math
-from datetime import datetime, timedelta
-from typing import List, Optional, Callable
-from pathlib import Path
-from .models import PhotoItem, TrackPoint, MatchItem, MATCH_STATUS_MATCHED, MATCH_STATUS_TOO_FAR
+import os
+from typing import Iterator, List, Optional, Callable, Union
+import numpy as np
+from .models import (
+    PhotoItem, TrackPoint, TrackTable, MatchItem,
+    MATCH_STATUS_MATCHED, MATCH_STATUS_TOO_FAR,
+    datetime_to_us
+)
 
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -43,291 +46,344 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return distance_m
 
 
-def match_photos_to_track(
+def calculate_distance_fast(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    使用等距圆柱投影近似计算两个GPS坐标之间的距离（米）
+
+    对相邻轨迹点这种短基线（几百米以内）的场景，精度与Haversine
+    几乎一致，但只需一次cos和一次hypot，适合热路径调用。
+    长距离计算请使用 calculate_distance。
+
+    Args:
+        lat1, lon1: 第一个点的纬度和经度
+        lat2, lon2: 第二个点的纬度和经度
+
+    Returns:
+        距离（米）
+    """
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    cos_mid = math.cos(math.radians((lat1 + lat2) * 0.5))
+    return math.hypot(dlat, dlon * cos_mid) * 6371000.0
+
+
+def match_photos_to_track_iter(
     photos: List[PhotoItem],
-    track_points: List[TrackPoint],
+    track_points: Union[List[TrackPoint], TrackTable],
     photo_tz_offset: float = 8.0,
     camera_offset_sec: float = 0.0,
     max_error_sec: float = 120.0,
     method: str = 'interp',
     max_distance_m: Optional[float] = None,
     on_progress: Optional[Callable[[int, int, str], None]] = None
-) -> List[MatchItem]:
+) -> Iterator[MatchItem]:
     """
-    将照片与轨迹点进行时间匹配
-    
+    将照片与轨迹点进行时间匹配，按照片顺序逐项产出结果
+
+    向量化预计算完成后立即开始产出，调用方可以边匹配边
+    展示首批结果，不必等全部照片组装完毕。
+
     Args:
         photos: 待处理照片列表
-        track_points: 轨迹点列表（已按时间排序）
+        track_points: 轨迹点列表或TrackTable（已按时间排序）
         photo_tz_offset: 照片时区偏移（小时），默认+8（东八区）
         camera_offset_sec: 相机时间偏移（秒），默认0
         max_error_sec: 最大允许误差（秒），默认120
         method: 匹配模式，'nearest' 或 'interp'（默认插值）
         max_distance_m: 插值模式下，两点间最大距离（米），None表示不限制
         on_progress: 进度回调函数 (done, total, message)，可选
-        
-    Returns:
-        匹配结果列表
-        
+
+    Yields:
+        MatchItem，顺序与photos一致
+
     Raises:
         ValueError: 轨迹点列表为空或参数无效
     """
     if not track_points:
         raise ValueError("轨迹点列表为空，无法进行匹配")
-    
+
     if method not in ('nearest', 'interp'):
         raise ValueError(f"无效的匹配模式: {method}，必须是 'nearest' 或 'interp'")
-    
-    # 提取时间列表用于二分查找
-    track_times = [p.t_utc for p in track_points]
-    
-    match_results = []
+
     total = len(photos)
-    
+
     if on_progress:
         on_progress(0, total, "开始匹配照片与轨迹...")
-    
-    for idx, photo in enumerate(photos, 1):
-        if on_progress and idx % 100 == 0:
-            on_progress(idx, total, f"匹配第 {idx}/{total} 张照片...")
-        
+
+    # 将轨迹点转换为连续的numpy数组（微秒时间戳 + 经纬度），
+    # 整个匹配过程只做一次searchsorted和一轮向量化算术，
+    # 避免逐张照片的Python级二分查找和datetime运算
+    # （TrackTable已经是列式数组，直接复用）
+    if isinstance(track_points, TrackTable):
+        table = track_points
+    else:
+        table = TrackTable.from_points(track_points)
+    n_track = len(table)
+    track_us = table.t_us
+    track_lat = table.lat
+    track_lon = table.lon
+
+    # 照片时间→UTC：时区和相机偏移对所有照片都是同一个标量增量
+    offset_us = int((camera_offset_sec - photo_tz_offset * 3600.0) * 1_000_000)
+
+    # 筛选待处理照片，批量计算时间戳
+    pending = [(i, photo) for i, photo in enumerate(photos)
+               if photo.status == 'need_process' and photo.datetime_utc is not None]
+    photo_us = np.fromiter(
+        (datetime_to_us(photo.datetime_utc) + offset_us for _, photo in pending),
+        dtype=np.int64, count=len(pending)
+    )
+
+    # 单次二分查找定位每张照片在轨迹中的插入位置
+    pos = np.searchsorted(track_us, photo_us)
+    pos_c = np.clip(pos, 1, n_track - 1)
+
+    # 相邻两点的时间和坐标（向量化gather）
+    t_before = track_us[pos_c - 1]
+    t_after = track_us[pos_c]
+    lat_before = track_lat[pos_c - 1]
+    lat_after = track_lat[pos_c]
+    lon_before = track_lon[pos_c - 1]
+    lon_after = track_lon[pos_c]
+
+    # 误差（秒）
+    err_before = np.abs(photo_us - t_before) / 1e6
+    err_after = np.abs(t_after - photo_us) / 1e6
+    nearest_is_before = err_before < err_after
+
+    # 线性插值：np.interp在C层完成内部二分查找和插值，
+    # 一次调用得到所有照片的坐标（时间相同的相邻点在组装时退化为前一个点）
+    span_us = t_after - t_before
+    interp_lat = np.interp(photo_us, track_us, track_lat)
+    interp_lon = np.interp(photo_us, track_us, track_lon)
+
+    # 插值模式下的距离过滤：批量计算相邻两点间的距离
+    # （相邻轨迹点间为短基线，用等距圆柱近似代替完整Haversine）
+    if method == 'interp' and max_distance_m is not None:
+        gap_m = _equirect_array(lat_before, lon_before, lat_after, lon_after)
+    else:
+        gap_m = None
+
+    # 进度只在整数百分比变化时上报（最多100次回调），
+    # 避免回调和字符串格式化开销压过匹配循环本身
+    last_pct = -1
+    pct_scale = 100.0 / total if total else 0.0
+    msg_tmpl = "匹配第 {done}/{total} 张照片..."
+    matched_count = 0
+
+    # 按照片顺序组装并逐项产出（pending保持photos的相对顺序，
+    # k随待处理照片递增，对应预计算数组的行号）
+    k = -1
+    for i, photo in enumerate(photos):
+        if on_progress:
+            pct = int((i + 1) * pct_scale)
+            if pct != last_pct:
+                on_progress(i + 1, total, msg_tmpl.format(done=i + 1, total=total))
+                last_pct = pct
+
         if photo.status != 'need_process' or photo.datetime_utc is None:
-            # 不是待处理照片，直接标记
-            match_results.append(MatchItem(
+            # 非待处理照片直接按原状态标记
+            yield MatchItem(
                 photo_path=photo.path,
+                photo_name=os.path.basename(photo.path),
                 lat=None,
                 lon=None,
                 error_sec=None,
                 method=None,
                 status=photo.status,
                 reason=None
-            ))
+            )
             continue
-        
-        # 将照片时间转换为UTC
-        # EXIF时间通常是本地时间，需要根据时区转换
-        photo_dt_utc = _convert_photo_time_to_utc(
-            photo.datetime_utc,
-            photo_tz_offset,
-            camera_offset_sec
-        )
-        
-        # 使用二分查找找到最近的点
-        idx = bisect.bisect_left(track_times, photo_dt_utc)
-        
-        # 确定相邻的两个轨迹点
-        if idx == 0:
+
+        k += 1
+        # 文件名在匹配时推导一次，展示层直接读取，无需再解析路径
+        photo_name = os.path.basename(photo.path)
+
+        if pos[k] == 0:
             # 照片时间早于所有轨迹点
-            nearest_point = track_points[0]
-            error_sec = abs((photo_dt_utc - nearest_point.t_utc).total_seconds())
-            
+            error_sec = float(err_before[k])
+            item = _make_boundary_item(
+                photo.path, photo_name, float(track_lat[0]), float(track_lon[0]),
+                error_sec, max_error_sec,
+                f"照片时间早于轨迹起点，误差{error_sec:.1f}秒"
+            )
+        elif pos[k] >= n_track:
+            # 照片时间晚于所有轨迹点
+            error_sec = float(err_after[k])
+            item = _make_boundary_item(
+                photo.path, photo_name, float(track_lat[-1]), float(track_lon[-1]),
+                error_sec, max_error_sec,
+                f"照片时间晚于轨迹终点，误差{error_sec:.1f}秒"
+            )
+        elif method == 'nearest':
+            # 最近点模式
+            if nearest_is_before[k]:
+                lat, lon, error_sec = float(lat_before[k]), float(lon_before[k]), float(err_before[k])
+            else:
+                lat, lon, error_sec = float(lat_after[k]), float(lon_after[k]), float(err_after[k])
+
             if error_sec > max_error_sec:
-                match_results.append(MatchItem(
+                item = MatchItem(
                     photo_path=photo.path,
+                    photo_name=photo_name,
                     lat=None,
                     lon=None,
                     error_sec=error_sec,
                     method=None,
                     status='too_far',
-                    reason=f"照片时间早于轨迹起点，误差{error_sec:.1f}秒"
-                ))
+                    reason=f"最近点误差{error_sec:.1f}秒超过阈值"
+                )
             else:
-                lat, lon = nearest_point.lat, nearest_point.lon
-                match_results.append(MatchItem(
+                item = MatchItem(
                     photo_path=photo.path,
+                    photo_name=photo_name,
                     lat=lat,
                     lon=lon,
                     error_sec=error_sec,
                     method='nearest',
                     status='matched',
                     reason=None
-                ))
-                
-        elif idx >= len(track_points):
-            # 照片时间晚于所有轨迹点
-            nearest_point = track_points[-1]
-            error_sec = abs((photo_dt_utc - nearest_point.t_utc).total_seconds())
-            
+                )
+        elif gap_m is not None and gap_m[k] > max_distance_m:
+            # 两点距离过大，降级为最近点模式
+            distance_m = float(gap_m[k])
+            if nearest_is_before[k]:
+                lat, lon, error_sec = float(lat_before[k]), float(lon_before[k]), float(err_before[k])
+            else:
+                lat, lon, error_sec = float(lat_after[k]), float(lon_after[k]), float(err_after[k])
+
             if error_sec > max_error_sec:
-                match_results.append(MatchItem(
+                item = MatchItem(
                     photo_path=photo.path,
+                    photo_name=photo_name,
                     lat=None,
                     lon=None,
                     error_sec=error_sec,
                     method=None,
                     status='too_far',
-                    reason=f"照片时间晚于轨迹终点，误差{error_sec:.1f}秒"
-                ))
+                    reason=f"两点距离{distance_m:.0f}米过大，降级为最近点模式，误差{error_sec:.1f}秒超过阈值"
+                )
             else:
-                lat, lon = nearest_point.lat, nearest_point.lon
-                match_results.append(MatchItem(
+                item = MatchItem(
                     photo_path=photo.path,
+                    photo_name=photo_name,
                     lat=lat,
                     lon=lon,
                     error_sec=error_sec,
                     method='nearest',
-                    status='matched',
-                    reason=None
-                ))
+                    status=MATCH_STATUS_MATCHED,
+                    reason=f"两点距离{distance_m:.0f}米过大，降级为最近点模式"
+                )
         else:
-            # 照片时间在两个轨迹点之间
-            point_before = track_points[idx - 1]
-            point_after = track_points[idx]
-            
-            if method == 'nearest':
-                # 最近点模式
-                error_before = abs((photo_dt_utc - point_before.t_utc).total_seconds())
-                error_after = abs((photo_dt_utc - point_after.t_utc).total_seconds())
-                
-                if error_before < error_after:
-                    nearest_point = point_before
-                    error_sec = error_before
-                else:
-                    nearest_point = point_after
-                    error_sec = error_after
-                
-                if error_sec > max_error_sec:
-                    match_results.append(MatchItem(
-                        photo_path=photo.path,
-                        lat=None,
-                        lon=None,
-                        error_sec=error_sec,
-                        method=None,
-                        status='too_far',
-                        reason=f"最近点误差{error_sec:.1f}秒超过阈值"
-                    ))
-                else:
-                    lat, lon = nearest_point.lat, nearest_point.lon
-                    match_results.append(MatchItem(
-                        photo_path=photo.path,
-                        lat=lat,
-                        lon=lon,
-                        error_sec=error_sec,
-                        method='nearest',
-                        status='matched',
-                        reason=None
-                    ))
+            # 插值模式（默认）
+            if span_us[k] == 0:
+                # 两个点时间相同，直接使用前一个点
+                lat, lon = float(lat_before[k]), float(lon_before[k])
+                error_sec = float(err_before[k])
             else:
-                # 插值模式（默认）
-                t_before = point_before.t_utc
-                t_after = point_after.t_utc
-                total_span = (t_after - t_before).total_seconds()
-                
-                # 检查两点间距离（如果启用了距离过滤）
-                if max_distance_m is not None:
-                    distance_m = calculate_distance(
-                        point_before.lat, point_before.lon,
-                        point_after.lat, point_after.lon
-                    )
-                    
-                    if distance_m > max_distance_m:
-                        # 两点距离过大，降级为最近点模式
-                        error_before = abs((photo_dt_utc - point_before.t_utc).total_seconds())
-                        error_after = abs((photo_dt_utc - point_after.t_utc).total_seconds())
-                        
-                        if error_before < error_after:
-                            nearest_point = point_before
-                            error_sec = error_before
-                        else:
-                            nearest_point = point_after
-                            error_sec = error_after
-                        
-                        if error_sec > max_error_sec:
-                            match_results.append(MatchItem(
-                                photo_path=photo.path,
-                                lat=None,
-                                lon=None,
-                                error_sec=error_sec,
-                                method=None,
-                                status='too_far',
-                                reason=f"两点距离{distance_m:.0f}米过大，降级为最近点模式，误差{error_sec:.1f}秒超过阈值"
-                            ))
-                        else:
-                            lat, lon = nearest_point.lat, nearest_point.lon
-                            match_results.append(MatchItem(
-                                photo_path=photo.path,
-                                lat=lat,
-                                lon=lon,
-                                error_sec=error_sec,
-                                method='nearest',
-                                status=MATCH_STATUS_MATCHED,
-                                reason=f"两点距离{distance_m:.0f}米过大，降级为最近点模式"
-                            ))
-                        
-                        if on_progress:
-                            on_progress(i + 1, total, f'匹配: {Path(photo.path).name}')
-                        continue
-                
-                # 进行线性插值计算经纬度
-                if total_span == 0:
-                    # 两个点时间相同，直接使用前一个点
-                    lat, lon = point_before.lat, point_before.lon
-                    error_sec = abs((photo_dt_utc - t_before).total_seconds())
-                else:
-                    ratio = (photo_dt_utc - t_before).total_seconds() / total_span
-                    lat = point_before.lat + (point_after.lat - point_before.lat) * ratio
-                    lon = point_before.lon + (point_after.lon - point_before.lon) * ratio
-                    
-                    # 误差取两个相邻点的平均误差
-                    error_before = abs((photo_dt_utc - t_before).total_seconds())
-                    error_after = abs((photo_dt_utc - t_after).total_seconds())
-                    error_sec = min(error_before, error_after)
-                
-                if error_sec > max_error_sec:
-                    match_results.append(MatchItem(
-                        photo_path=photo.path,
-                        lat=None,
-                        lon=None,
-                        error_sec=error_sec,
-                        method=None,
-                        status='too_far',
-                        reason=f"插值误差{error_sec:.1f}秒超过阈值"
-                    ))
-                else:
-                    match_results.append(MatchItem(
-                        photo_path=photo.path,
-                        lat=lat,
-                        lon=lon,
-                        error_sec=error_sec,
-                        method='interp',
-                        status=MATCH_STATUS_MATCHED,
-                        reason=None
-                    ))
-    
+                lat, lon = float(interp_lat[k]), float(interp_lon[k])
+                error_sec = float(min(err_before[k], err_after[k]))
+
+            if error_sec > max_error_sec:
+                item = MatchItem(
+                    photo_path=photo.path,
+                    photo_name=photo_name,
+                    lat=None,
+                    lon=None,
+                    error_sec=error_sec,
+                    method=None,
+                    status='too_far',
+                    reason=f"插值误差{error_sec:.1f}秒超过阈值"
+                )
+            else:
+                item = MatchItem(
+                    photo_path=photo.path,
+                    photo_name=photo_name,
+                    lat=lat,
+                    lon=lon,
+                    error_sec=error_sec,
+                    method='interp',
+                    status=MATCH_STATUS_MATCHED,
+                    reason=None
+                )
+
+        if item.status == MATCH_STATUS_MATCHED:
+            matched_count += 1
+        yield item
+
     if on_progress:
-        matched_count = sum(1 for m in match_results if m.status == MATCH_STATUS_MATCHED)
         on_progress(total, total, f"匹配完成：{matched_count}/{total} 张照片匹配成功")
-    
-    return match_results
 
 
-def _convert_photo_time_to_utc(
-    photo_dt: datetime,
-    tz_offset: float,
-    camera_offset_sec: float
-) -> datetime:
+def match_photos_to_track(
+    photos: List[PhotoItem],
+    track_points: Union[List[TrackPoint], TrackTable],
+    photo_tz_offset: float = 8.0,
+    camera_offset_sec: float = 0.0,
+    max_error_sec: float = 120.0,
+    method: str = 'interp',
+    max_distance_m: Optional[float] = None,
+    on_progress: Optional[Callable[[int, int, str], None]] = None
+) -> List[MatchItem]:
     """
-    将照片时间转换为UTC时间
-    
-    Args:
-        photo_dt: 照片EXIF时间（naive datetime，本地时间）
-        tz_offset: 时区偏移（小时）
-        camera_offset_sec: 相机时间偏移（秒）
-        
+    将照片与轨迹点进行时间匹配
+
+    match_photos_to_track_iter的列表封装，参数含义与其一致。
+
     Returns:
-        UTC时间（naive datetime）
+        匹配结果列表（顺序与photos一致）
+
+    Raises:
+        ValueError: 轨迹点列表为空或参数无效
     """
-    from datetime import timezone, timedelta
-    
-    # 将本地时间转换为UTC
-    tz = timezone(timedelta(hours=tz_offset))
-    photo_dt_tz = photo_dt.replace(tzinfo=tz)
-    photo_dt_utc = photo_dt_tz.astimezone(timezone.utc)
-    
-    # 应用相机偏移
-    if camera_offset_sec != 0:
-        photo_dt_utc = photo_dt_utc + timedelta(seconds=camera_offset_sec)
-    
-    # 返回naive datetime（与轨迹点时间格式一致）
-    return photo_dt_utc.replace(tzinfo=None)
+    # 结果数等于照片数，预分配一次到位，免去list(...)的渐进扩容
+    results: List[Optional[MatchItem]] = [None] * len(photos)
+    for i, item in enumerate(match_photos_to_track_iter(
+            photos, track_points, photo_tz_offset, camera_offset_sec,
+            max_error_sec, method, max_distance_m, on_progress)):
+        results[i] = item
+    return results
+
+
+def _make_boundary_item(
+    photo_path: str,
+    photo_name: str,
+    lat: float,
+    lon: float,
+    error_sec: float,
+    max_error_sec: float,
+    too_far_reason: str
+) -> MatchItem:
+    """构建轨迹起点/终点之外照片的匹配结果"""
+    if error_sec > max_error_sec:
+        return MatchItem(
+            photo_path=photo_path,
+            photo_name=photo_name,
+            lat=None,
+            lon=None,
+            error_sec=error_sec,
+            method=None,
+            status='too_far',
+            reason=too_far_reason
+        )
+    return MatchItem(
+        photo_path=photo_path,
+        photo_name=photo_name,
+        lat=lat,
+        lon=lon,
+        error_sec=error_sec,
+        method='nearest',
+        status='matched',
+        reason=None
+    )
+
 
+def _equirect_array(
+    lat1: np.ndarray, lon1: np.ndarray,
+    lat2: np.ndarray, lon2: np.ndarray
+) -> np.ndarray:
+    """对坐标数组批量计算等距圆柱近似距离（米），见 calculate_distance_fast"""
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    cos_mid = np.cos(np.radians((lat1 + lat2) * 0.5))
+    return np.hypot(dlat, dlon * cos_mid) * 6371000.0
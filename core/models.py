@@ -2,10 +2,20 @@
 数据模型定义
 统一全链路使用的数据结构
 """
+from collections import namedtuple
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import List, Optional
 from pathlib import Path
+import numpy as np
+
+# Unix纪元（用于将naive UTC datetime转换为整数微秒时间戳）
+_EPOCH = datetime(1970, 1, 1)
+
+
+def datetime_to_us(dt: datetime) -> int:
+    """将naive UTC datetime转换为纪元微秒数"""
+    return int((dt - _EPOCH).total_seconds() * 1_000_000)
 
 
 # 状态常量定义
@@ -24,7 +34,7 @@ MATCH_METHOD_NEAREST = 'nearest'
 MATCH_METHOD_INTERP = 'interp'
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PhotoItem:
     """照片项"""
     path: str
@@ -33,7 +43,9 @@ class PhotoItem:
     status: str  # 'already_gps' | 'need_process' | 'no_time'
     
     def __post_init__(self):
-        """数据验证"""
+        """数据验证（python -O 运行时跳过）"""
+        if not __debug__:
+            return
         # 验证路径
         if not self.path:
             raise ValueError("照片路径不能为空")
@@ -59,7 +71,7 @@ class PhotoItem:
                 f"datetime_utc={dt_str}, status='{self.status}')")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TrackPoint:
     """轨迹点"""
     t_utc: datetime
@@ -67,7 +79,9 @@ class TrackPoint:
     lon: float
     
     def __post_init__(self):
-        """数据验证"""
+        """数据验证（python -O 运行时跳过）"""
+        if not __debug__:
+            return
         # 验证经纬度范围
         if not (-90.0 <= self.lat <= 90.0):
             raise ValueError(f"纬度超出有效范围 [-90, 90]: {self.lat}")
@@ -91,7 +105,94 @@ class TrackPoint:
         return self.t_utc < other.t_utc
 
 
-@dataclass
+# TrackTable迭代时产出的轻量记录（与TrackPoint同字段）
+TrackRecord = namedtuple('TrackRecord', 't_utc lat lon')
+
+
+class TrackTable:
+    """
+    轨迹点的列式（SoA）存储
+
+    用三个平行的numpy数组（微秒时间戳、纬度、经度）代替
+    List[TrackPoint]，匹配阶段可以直接做searchsorted和向量化插值，
+    内存占用也远小于逐点的dataclass实例。
+    """
+    __slots__ = ('t_us', 'lat', 'lon')
+
+    def __init__(self, t_us: np.ndarray, lat: np.ndarray, lon: np.ndarray):
+        """
+        初始化轨迹表
+
+        Args:
+            t_us: int64数组，纪元微秒时间戳（需已按时间排序）
+            lat: float64数组，纬度
+            lon: float64数组，经度
+        """
+        self.t_us = t_us
+        self.lat = lat
+        self.lon = lon
+
+    @classmethod
+    def from_points(cls, points: List[TrackPoint]) -> 'TrackTable':
+        """
+        从TrackPoint列表构建轨迹表（按时间排序）
+
+        Args:
+            points: 轨迹点列表
+
+        Returns:
+            TrackTable实例
+        """
+        n = len(points)
+        t_us = np.fromiter((datetime_to_us(p.t_utc) for p in points),
+                           dtype=np.int64, count=n)
+        lat = np.fromiter((p.lat for p in points), dtype=np.float64, count=n)
+        lon = np.fromiter((p.lon for p in points), dtype=np.float64, count=n)
+        return cls.from_arrays(t_us, lat, lon)
+
+    @classmethod
+    def from_arrays(cls, t_us, lat, lon) -> 'TrackTable':
+        """
+        从平行数组构建轨迹表（按时间排序）
+
+        Args:
+            t_us: 纪元微秒时间戳（任意可转为int64数组的序列）
+            lat: 纬度序列
+            lon: 经度序列
+
+        Returns:
+            TrackTable实例
+        """
+        t_us = np.ascontiguousarray(t_us, dtype=np.int64)
+        lat = np.ascontiguousarray(lat, dtype=np.float64)
+        lon = np.ascontiguousarray(lon, dtype=np.float64)
+
+        # 确保按时间排序（解析器通常已排好，乱序时重排一次）
+        if len(t_us) > 1 and np.any(t_us[1:] < t_us[:-1]):
+            order = np.argsort(t_us, kind='stable')
+            t_us = t_us[order]
+            lat = lat[order]
+            lon = lon[order]
+
+        return cls(t_us, lat, lon)
+
+    def __len__(self) -> int:
+        return len(self.t_us)
+
+    def __iter__(self):
+        """按时间顺序产出轻量记录（兼容按对象遍历轨迹点的代码）"""
+        for t, la, lo in zip(self.t_us, self.lat, self.lon):
+            yield TrackRecord(
+                t_utc=_EPOCH + timedelta(microseconds=int(t)),
+                lat=float(la),
+                lon=float(lo)
+            )
+
+    def __repr__(self) -> str:
+        return f"TrackTable(n={len(self.t_us)})"
+
+
+@dataclass(slots=True, frozen=True)
 class MatchItem:
     """匹配结果项"""
     photo_path: str
@@ -101,9 +202,13 @@ class MatchItem:
     method: Optional[str]  # 'nearest' | 'interp'
     status: str  # 'matched' | 'unmatched' | 'too_far' | 'already_gps' | 'no_time' | 'write_failed'
     reason: Optional[str]  # 状态原因说明
+    # 文件名（匹配时由photo_path一次性推导，避免展示层逐行解析路径）
+    photo_name: str = ''
     
     def __post_init__(self):
-        """数据验证"""
+        """数据验证（python -O 运行时跳过）"""
+        if not __debug__:
+            return
         # 验证路径
         if not self.photo_path:
             raise ValueError("照片路径不能为空")
@@ -2,9 +2,12 @@
 处理流水线模块
 将扫描、匹配、写入、报告串联起来
 """
-from typing import Callable, Optional, List
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, List, Tuple
 from pathlib import Path
-from .models import PhotoItem, TrackPoint, MatchItem
+from .models import PhotoItem, TrackPoint, TrackTable, MatchItem
 from .models import MATCH_STATUS_MATCHED, MATCH_STATUS_UNMATCHED, MATCH_STATUS_TOO_FAR
 from .scan import scan_photos
 from .track import parse_gpx, parse_csv
@@ -13,6 +16,17 @@ from .exif_io import write_gps_to_copy, write_gps_inplace
 from .report import generate_report as create_report
 
 
+def _write_one(task: Tuple[str, Optional[str], float, float]) -> bool:
+    """单张照片的GPS写入（线程池任务用），dst_path为None表示覆盖原文件"""
+    src_path, dst_path, lat, lon = task
+    try:
+        if dst_path is None:
+            return write_gps_inplace(src_path, lat, lon)
+        return write_gps_to_copy(src_path, dst_path, lat, lon)
+    except Exception:
+        return False
+
+
 def process_pipeline(
     folder_path: str,
     track_path: str,
@@ -29,7 +43,8 @@ def process_pipeline(
     csv_col_map: Optional[dict] = None,
     csv_time_is_utc: bool = True,
     csv_tz_offset: float = 0.0,
-    on_progress: Optional[Callable[[str, int, int, str], None]] = None
+    on_progress: Optional[Callable[[str, int, int, str], None]] = None,
+    track_table: Optional['TrackTable'] = None
 ) -> dict:
     """
     执行完整的处理流水线
@@ -50,7 +65,8 @@ def process_pipeline(
         csv_time_is_utc: CSV时间是否为UTC（仅CSV需要）
         csv_tz_offset: CSV时区偏移（仅CSV需要）
         on_progress: 进度回调函数 (phase, done, total, message)
-        
+        track_table: 已解析好的轨迹表（调用方缓存），传入时跳过解析阶段
+
     Returns:
         处理结果摘要字典
     """
@@ -64,34 +80,38 @@ def process_pipeline(
     if on_progress:
         on_progress('scanning', total_photos, total_photos, f'扫描完成：共{total_photos}张照片')
     
-    # 阶段2：解析轨迹
-    if on_progress:
-        on_progress('parsing_track', 0, 0, f'开始解析轨迹文件: {track_path}')
-    
-    if track_type.lower() == 'gpx':
-        track_points = parse_gpx(track_path)
-    elif track_type.lower() == 'csv':
-        track_points = parse_csv(
-            track_path,
-            col_map=csv_col_map,
-            time_is_utc=csv_time_is_utc,
-            tz_offset=csv_tz_offset,
-            time_format='auto'  # 自动检测时间格式
-        )
-    else:
-        raise ValueError(f"不支持的轨迹类型: {track_type}")
-    
+    # 阶段2：解析轨迹（调用方已缓存的轨迹表直接复用）
+    if track_table is None:
+        if on_progress:
+            on_progress('parsing_track', 0, 0, f'开始解析轨迹文件: {track_path}')
+
+        # 解析器直接产出列式存储（不构建逐点TrackPoint对象，
+        # 时间戳数组只构建一次，匹配阶段直接做向量化查找）
+        if track_type.lower() == 'gpx':
+            track_table = parse_gpx(track_path, return_soa=True)
+        elif track_type.lower() == 'csv':
+            track_table = parse_csv(
+                track_path,
+                col_map=csv_col_map,
+                time_is_utc=csv_time_is_utc,
+                tz_offset=csv_tz_offset,
+                time_format='auto',  # 自动检测时间格式
+                return_soa=True
+            )
+        else:
+            raise ValueError(f"不支持的轨迹类型: {track_type}")
+
     if on_progress:
-        on_progress('parsing_track', len(track_points), len(track_points), 
-                   f'轨迹解析完成：共{len(track_points)}个轨迹点')
-    
+        on_progress('parsing_track', len(track_table), len(track_table),
+                   f'轨迹解析完成：共{len(track_table)}个轨迹点')
+
     # 阶段3：匹配
     if on_progress:
         on_progress('matching', 0, len(need_process), '开始匹配照片与轨迹...')
-    
+
     match_results = match_photos_to_track(
         need_process,
-        track_points,
+        track_table,
         photo_tz_offset,
         camera_offset_sec,
         max_error_sec,
@@ -99,15 +119,15 @@ def process_pipeline(
         max_distance_m
     )
     
+    # 单次遍历统计各状态数量，后续进度消息和返回摘要共用
+    status_counts = Counter(m.status for m in match_results)
+    matched_count = status_counts[MATCH_STATUS_MATCHED]
+
     if on_progress:
-        matched_count = sum(1 for m in match_results if m.status == MATCH_STATUS_MATCHED)
         on_progress('matching', len(need_process), len(need_process),
                    f'匹配完成：{matched_count}/{len(need_process)}张照片匹配成功')
     
     # 阶段4：写入和报告
-    if on_progress:
-        on_progress('writing', 0, len(match_results), '开始写入GPS信息...')
-    
     # 根据输出模式选择不同的写入方式
     if output_mode == 'copy':
         output_path = Path(output_dir)
@@ -115,34 +135,56 @@ def process_pipeline(
     else:
         # overwrite模式：输出路径设为照片所在目录
         output_path = Path(folder_path)
-    
-    write_success = 0
-    write_failed = 0
-    
-    for i, match_item in enumerate(match_results):
+
+    # 可写性只在这里探测一次，权限问题立即暴露，
+    # 不必等成批照片在写入阶段逐个失败
+    if not os.access(str(output_path), os.W_OK):
+        raise PermissionError(f"输出目录不可写: {output_path}")
+
+    # 收集需要写入的照片（JPEG快路径下写入以文件复制和APP1段重写为主，
+    # 线程池让多张照片的I/O相互重叠）
+    write_tasks = []
+    write_names = []
+    for match_item in match_results:
         if match_item.status == MATCH_STATUS_MATCHED and match_item.lat is not None and match_item.lon is not None:
             src_path = Path(match_item.photo_path)
-            
-            try:
-                if output_mode == 'copy':
-                    # 创建副本模式：生成输出路径（扁平输出，MVP不保持目录结构）
-                    dst_path = output_path / src_path.name
-                    if write_gps_to_copy(str(src_path), str(dst_path), match_item.lat, match_item.lon):
-                        write_success += 1
-                    else:
-                        write_failed += 1
-                else:
-                    # 覆盖模式：直接修改原文件
-                    if write_gps_inplace(str(src_path), match_item.lat, match_item.lon):
-                        write_success += 1
-                    else:
-                        write_failed += 1
-            except Exception:
-                write_failed += 1
-        
+            name = src_path.name
+            if output_mode == 'copy':
+                # 创建副本模式：生成输出路径（扁平输出，MVP不保持目录结构）
+                dst_path = str(output_path / name)
+            else:
+                # 覆盖模式：直接修改原文件
+                dst_path = None
+            write_tasks.append((str(src_path), dst_path, match_item.lat, match_item.lon))
+            write_names.append(name)
+
+    write_success = 0
+    write_failed = 0
+
+    if write_tasks:
         if on_progress:
-            on_progress('writing', i + 1, len(match_results), 
-                      f'正在处理: {Path(match_item.photo_path).name}')
+            on_progress('writing', 0, len(write_tasks), '开始写入GPS信息...')
+
+        # 写入进度同样只在整数百分比变化时上报
+        last_pct = -1
+        pct_scale = 100.0 / len(write_tasks)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for i, ok in enumerate(executor.map(_write_one, write_tasks)):
+                if ok:
+                    write_success += 1
+                else:
+                    write_failed += 1
+
+                if on_progress:
+                    pct = int((i + 1) * pct_scale)
+                    if pct != last_pct:
+                        on_progress('writing', i + 1, len(write_tasks),
+                                  f'正在处理: {write_names[i]}')
+                        last_pct = pct
+    elif on_progress:
+        # 没有匹配成功的照片，跳过写入阶段
+        on_progress('writing', 0, 0, '没有可写入的照片，跳过写入')
     
     # 生成报告（可选）
     report_path = None
@@ -172,8 +214,8 @@ def process_pipeline(
         'already_gps': len(already_gps),
         'need_process': len(need_process),
         'no_time': len(no_time),
-        'matched': sum(1 for m in match_results if m.status == MATCH_STATUS_MATCHED),
-        'unmatched': sum(1 for m in match_results if m.status in [MATCH_STATUS_UNMATCHED, MATCH_STATUS_TOO_FAR]),
+        'matched': matched_count,
+        'unmatched': status_counts[MATCH_STATUS_UNMATCHED] + status_counts[MATCH_STATUS_TOO_FAR],
         'write_success': write_success,
         'write_failed': write_failed,
         'output_dir': str(output_path),
@@ -3,6 +3,8 @@
 生成CSV格式的处理报告
 """
 import csv
+import os
+from collections import Counter
 from pathlib import Path
 from typing import List
 from .models import PhotoItem, MatchItem
@@ -39,74 +41,84 @@ def generate_report(
     report_file = Path(report_path)
     report_file.parent.mkdir(parents=True, exist_ok=True)
     
-    # 构建匹配结果字典（以照片路径为key）
-    match_dict = {m.photo_path: m for m in match_results}
-    
-    with open(report_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        
-        # 写入表头
-        writer.writerow([
-            'path', 'filename', 'status', 'error_sec', 'lat', 'lon', 'method', 'note'
+    # match_photos_to_track的结果与输入照片同序等长，直接按位置配对，
+    # 省去以长路径字符串为key的哈希表；长度不一致（外部调用方自行
+    # 组装的结果）时退回按路径查找
+    if len(match_results) == len(need_process):
+        pairs = zip(need_process, match_results)
+    else:
+        match_dict = {m.photo_path: m for m in match_results}
+        pairs = ((photo, match_dict.get(photo.path)) for photo in need_process)
+
+    # 先把所有行收集到内存，最后一次writerows写出：
+    # Python到C的csv调用从每行一次降为一次，写文件用1MB缓冲减少系统调用
+    rows = []
+
+    # 已有GPS的照片
+    for photo in already_gps:
+        rows.append([
+            photo.path,
+            os.path.basename(photo.path),
+            'already_gps',
+            '',
+            '',
+            '',
+            '',
+            '照片已包含GPS信息'
         ])
-        
-        # 写入已有GPS的照片
-        for photo in already_gps:
-            writer.writerow([
+
+    # 待处理照片的匹配结果
+    for photo, match_item in pairs:
+        if match_item:
+            rows.append([
                 photo.path,
-                Path(photo.path).name,
-                'already_gps',
-                '',
-                '',
-                '',
-                '',
-                '照片已包含GPS信息'
+                os.path.basename(photo.path),
+                match_item.status,
+                f'{match_item.error_sec:.2f}' if match_item.error_sec else '',
+                f'{match_item.lat:.6f}' if match_item.lat else '',
+                f'{match_item.lon:.6f}' if match_item.lon else '',
+                match_item.method or '',
+                match_item.reason or ''
             ])
-        
-        # 写入待处理照片的匹配结果
-        for photo in need_process:
-            match_item = match_dict.get(photo.path)
-            if match_item:
-                writer.writerow([
-                    photo.path,
-                    Path(photo.path).name,
-                    match_item.status,
-                    f'{match_item.error_sec:.2f}' if match_item.error_sec else '',
-                    f'{match_item.lat:.6f}' if match_item.lat else '',
-                    f'{match_item.lon:.6f}' if match_item.lon else '',
-                    match_item.method or '',
-                    match_item.reason or ''
-                ])
-            else:
-                writer.writerow([
-                    photo.path,
-                    Path(photo.path).name,
-                    'unmatched',
-                    '',
-                    '',
-                    '',
-                    '',
-                    '未找到匹配结果'
-                ])
-        
-        # 写入无时间照片
-        for photo in no_time:
-            writer.writerow([
+        else:
+            rows.append([
                 photo.path,
-                Path(photo.path).name,
-                'no_time',
+                os.path.basename(photo.path),
+                'unmatched',
                 '',
                 '',
                 '',
                 '',
-                '照片无可用拍摄时间'
+                '未找到匹配结果'
             ])
-    
-    # 计算摘要
-    matched_count = sum(1 for m in match_results if m.status == MATCH_STATUS_MATCHED)
-    unmatched_count = sum(1 for m in match_results if m.status in [MATCH_STATUS_UNMATCHED, MATCH_STATUS_TOO_FAR])
-    write_failed_count = sum(1 for m in match_results if m.status == MATCH_STATUS_WRITE_FAILED)
-    
+
+    # 无时间照片
+    for photo in no_time:
+        rows.append([
+            photo.path,
+            os.path.basename(photo.path),
+            'no_time',
+            '',
+            '',
+            '',
+            '',
+            '照片无可用拍摄时间'
+        ])
+
+    with open(report_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        # 表头
+        writer.writerow([
+            'path', 'filename', 'status', 'error_sec', 'lat', 'lon', 'method', 'note'
+        ])
+        writer.writerows(rows)
+
+    # 计算摘要（单次遍历统计所有状态）
+    counts = Counter(m.status for m in match_results)
+    matched_count = counts[MATCH_STATUS_MATCHED]
+    unmatched_count = counts[MATCH_STATUS_UNMATCHED] + counts[MATCH_STATUS_TOO_FAR]
+    write_failed_count = counts[MATCH_STATUS_WRITE_FAILED]
+
     summary = {
         'total': len(already_gps) + len(need_process) + len(no_time),
         'already_gps': len(already_gps),
@@ -2,12 +2,61 @@
 扫描照片模块
 扫描文件夹内照片并分类：已含GPS、缺GPS且有时间、缺GPS但无时间
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from typing import List, Tuple, Optional, Callable
 from .models import PhotoItem, PHOTO_STATUS_ALREADY_GPS, PHOTO_STATUS_NEED_PROCESS, PHOTO_STATUS_NO_TIME
 from .exif_io import read_exif_info
 
 
+# 支持的扩展名（MVP：仅JPEG）
+_EXTENSIONS = {'.jpg', '.jpeg'}
+# 常见大小写预展开，str.endswith对元组是C级短扫描，
+# 省去绝大多数文件的切片+lower分配
+_EXTENSIONS_FAST = ('.jpg', '.jpeg', '.JPG', '.JPEG')
+
+
+def _iter_jpegs(root: str, recursive: bool):
+    """用os.scandir枚举目录下的JPEG文件路径
+
+    DirEntry的is_file/is_dir直接复用readdir缓冲区的信息，
+    不为每个条目额外发起stat系统调用，也不构造Path对象。
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = entry.name
+                    if name.endswith(_EXTENSIONS_FAST):
+                        yield entry.path
+                    else:
+                        # 罕见的混合大小写（如.JpG）仍按小写后缀判断
+                        dot = name.rfind('.')
+                        if dot >= 0 and name[dot:].lower() in _EXTENSIONS:
+                            yield entry.path
+
+
+def _safe_scan_read(path: str) -> Optional[Tuple[bool, Optional[datetime]]]:
+    """read_exif_info的异常安全包装（扫描线程池任务用）
+
+    返回None表示文件在扫描后被删除（跳过），
+    其他读取失败（EXIF损坏、格式不支持等）返回(False, None)归为no_time。
+    """
+    try:
+        return read_exif_info(path)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        return False, None
+
+
 def scan_photos(
     folder_path: str,
     recursive: bool = False,
@@ -49,61 +98,60 @@ def scan_photos(
     already_gps = []
     need_process = []
     no_time = []
-    
-    # 支持的扩展名（MVP：仅JPEG）
-    extensions = {'.jpg', '.jpeg'}
-    
+
     # 遍历文件
     try:
-        if recursive:
-            image_files = [f for f in folder.rglob('*') if f.is_file() and f.suffix.lower() in extensions]
-        else:
-            image_files = [f for f in folder.iterdir() if f.is_file() and f.suffix.lower() in extensions]
+        paths = list(_iter_jpegs(str(folder), recursive))
     except PermissionError:
         raise PermissionError(f"无权限访问文件夹或其子目录: {folder_path}")
-    
-    total = len(image_files)
-    
-    for idx, img_path in enumerate(image_files, 1):
-        # 进度回调
-        if on_progress:
-            on_progress(idx, total, str(img_path))
-        
-        try:
-            has_gps, datetime_utc = read_exif_info(str(img_path))
-            
+
+    total = len(paths)
+
+    # EXIF读取以文件I/O为主，用线程池让多张照片的磁盘延迟相互重叠；
+    # 结果在主线程按原顺序消费并分类，无需加锁
+    max_workers = min(32, (os.cpu_count() or 4) * 4)
+
+    # 进度只在整数百分比变化时上报（最多100次回调），
+    # 避免每个文件一次UI回调在小照片场景下反客为主
+    last_pct = -1
+    pct_scale = 100.0 / total if total else 0.0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for idx, (img_path, result) in enumerate(
+                zip(paths, executor.map(_safe_scan_read, paths, chunksize=16)), 1):
+            # 进度回调
+            if on_progress:
+                pct = int(idx * pct_scale)
+                if pct != last_pct:
+                    on_progress(idx, total, img_path)
+                    last_pct = pct
+
+            if result is None:
+                # 文件在扫描后被删除，跳过
+                continue
+
+            has_gps, datetime_utc = result
             if has_gps:
                 already_gps.append(PhotoItem(
-                    path=str(img_path),
+                    path=img_path,
                     has_gps=True,
                     datetime_utc=datetime_utc,
                     status=PHOTO_STATUS_ALREADY_GPS
                 ))
             elif datetime_utc:
                 need_process.append(PhotoItem(
-                    path=str(img_path),
+                    path=img_path,
                     has_gps=False,
                     datetime_utc=datetime_utc,
                     status=PHOTO_STATUS_NEED_PROCESS
                 ))
             else:
                 no_time.append(PhotoItem(
-                    path=str(img_path),
+                    path=img_path,
                     has_gps=False,
                     datetime_utc=None,
                     status=PHOTO_STATUS_NO_TIME
                 ))
-        except FileNotFoundError:
-            # 文件在扫描后被删除，跳过
-            continue
-        except Exception:
-            # 读取失败（EXIF损坏、格式不支持等），归为 no_time
-            no_time.append(PhotoItem(
-                path=str(img_path),
-                has_gps=False,
-                datetime_utc=None,
-                status=PHOTO_STATUS_NO_TIME
-            ))
-    
+
     return already_gps, need_process, no_time
 
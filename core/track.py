@@ -2,29 +2,45 @@
 轨迹解析模块
 解析GPX和CSV格式的轨迹文件
 """
+import re
 from datetime import datetime, timezone
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional, Callable
-import gpxpy
-import pandas as pd
-from dateutil import parser as date_parser
-from .models import TrackPoint
+from typing import List, Optional, Callable, Tuple
+import numpy as np
+from .models import TrackPoint, TrackTable, datetime_to_us
+
+# attrgetter为C实现，排序时的键提取比lambda快约一倍
+_SORT_KEY = attrgetter('t_utc')
+
+# gpxpy和pandas延迟到实际解析对应格式时再导入：
+# 两者冷启动各需数百毫秒，只用一种轨迹格式时另一个完全不加载
+
+# lxml的iterparse为C实现的流式解析，大GPX文件下比gpxpy的
+# 全量DOM快一个数量级且内存恒定；未安装时回退到gpxpy
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:
+    _lxml_etree = None
 
 
 def parse_gpx(
     gpx_path: str,
-    on_progress: Optional[Callable[[int, int, str], None]] = None
-) -> List[TrackPoint]:
+    on_progress: Optional[Callable[[int, int, str], None]] = None,
+    return_soa: bool = False
+):
     """
     解析GPX文件
-    
+
     Args:
         gpx_path: GPX文件路径
         on_progress: 进度回调函数 (done, total, message)，可选
-        
+        return_soa: 为True时返回TrackTable（列式数组），
+                    跳过逐点TrackPoint对象的构建
+
     Returns:
-        轨迹点列表（按时间排序）
-        
+        轨迹点列表或TrackTable（均按时间排序）
+
     Raises:
         FileNotFoundError: 文件不存在
         ValueError: 文件格式错误或无有效轨迹点
@@ -32,27 +48,149 @@ def parse_gpx(
     path = Path(gpx_path)
     if not path.exists():
         raise FileNotFoundError(f"GPX文件不存在: {gpx_path}")
-    
+
     if on_progress:
         on_progress(0, 0, "开始解析GPX文件...")
-    
+
+    if _lxml_etree is not None:
+        times, lats, lons = _parse_gpx_lxml(gpx_path, on_progress)
+    else:
+        times, lats, lons = _parse_gpx_gpxpy(gpx_path, on_progress)
+
+    n = len(times)
+
+    # 基础校验
+    if not n:
+        raise ValueError("GPX文件中没有找到有效的轨迹点（需要包含时间、经纬度信息）")
+
+    if on_progress:
+        on_progress(n, n, "排序轨迹点...")
+
+    if return_soa:
+        # 直接构建列式数组（from_arrays内部按时间排序），
+        # 不为每个点分配TrackPoint实例
+        table = TrackTable.from_arrays(
+            np.fromiter((datetime_to_us(t) for t in times), dtype=np.int64, count=n),
+            np.array(lats, dtype=np.float64),
+            np.array(lons, dtype=np.float64)
+        )
+        if on_progress:
+            on_progress(n, n, f"解析完成：共 {n} 个轨迹点")
+        return table
+
+    track_points = [
+        TrackPoint(t_utc=t, lat=la, lon=lo)
+        for t, la, lo in zip(times, lats, lons)
+    ]
+
+    # 按时间排序
+    track_points.sort(key=_SORT_KEY)
+
+    if on_progress:
+        on_progress(n, n, f"解析完成：共 {n} 个轨迹点")
+
+    return track_points
+
+
+_ISO_TIME_RE = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')
+
+
+def _detect_time_parse_format(series: 'pd.Series') -> str:
+    """从前若干行采样选择pandas时间解析格式
+
+    ISO样式的列走format='ISO8601'的C快路径；
+    其他写法退回format='mixed'逐值推断（较慢但通吃）。
+    """
+    samples = series.dropna().astype(str).head(100)
+    if len(samples) and all(_ISO_TIME_RE.match(s) for s in samples):
+        return 'ISO8601'
+    return 'mixed'
+
+
+def _gpx_time_to_utc(t_text: str) -> Optional[datetime]:
+    """解析GPX时间字符串为naive UTC datetime，格式无效时返回None"""
+    try:
+        t = datetime.fromisoformat(t_text)
+    except ValueError:
+        try:
+            # 兼容旧Python对'Z'后缀的处理
+            t = datetime.fromisoformat(t_text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    # 将时间转换为naive datetime（去除时区信息，统一为UTC）
+    if t.tzinfo is not None:
+        return t.astimezone(timezone.utc).replace(tzinfo=None)
+    # 假设已经是UTC
+    return t
+
+
+def _parse_gpx_lxml(
+    gpx_path: str,
+    on_progress: Optional[Callable[[int, int, str], None]] = None
+) -> Tuple[List[datetime], List[float], List[float]]:
+    """用lxml流式解析GPX的trkpt节点，返回(时间, 纬度, 经度)三个平行列表
+
+    只物化轨迹点元素并在消费后立即释放，
+    不构建整棵DOM树，峰值内存与文件大小无关。
+    """
+    times: List[datetime] = []
+    lats: List[float] = []
+    lons: List[float] = []
+    try:
+        # '{*}'通配命名空间，同时兼容GPX 1.0和1.1
+        for _, el in _lxml_etree.iterparse(gpx_path, tag='{*}trkpt'):
+            lat = el.get('lat')
+            lon = el.get('lon')
+            t_text = el.findtext('{*}time')
+
+            if t_text and lat is not None and lon is not None:
+                t_utc = _gpx_time_to_utc(t_text)
+                if t_utc is not None:
+                    times.append(t_utc)
+                    lats.append(float(lat))
+                    lons.append(float(lon))
+                    if on_progress and len(times) % 10000 == 0:
+                        on_progress(len(times), 0,
+                                    f"已解析 {len(times)} 个轨迹点...")
+
+            # 释放已处理的元素及其之前的兄弟节点，保持内存恒定
+            el.clear()
+            parent = el.getparent()
+            if parent is not None:
+                while el.getprevious() is not None:
+                    del parent[0]
+    except Exception as e:
+        raise ValueError(f"GPX文件格式错误: {e}")
+
+    return times, lats, lons
+
+
+def _parse_gpx_gpxpy(
+    gpx_path: str,
+    on_progress: Optional[Callable[[int, int, str], None]] = None
+) -> Tuple[List[datetime], List[float], List[float]]:
+    """用gpxpy解析GPX（lxml不可用时的回退路径）"""
+    import gpxpy
+
     try:
         with open(gpx_path, 'r', encoding='utf-8') as f:
             gpx = gpxpy.parse(f)
     except Exception as e:
         raise ValueError(f"GPX文件格式错误: {e}")
-    
-    track_points = []
+
+    times: List[datetime] = []
+    lats: List[float] = []
+    lons: List[float] = []
     total_segments = sum(len(track.segments) for track in gpx.tracks)
     processed_segments = 0
-    
+
     for track in gpx.tracks:
         for segment in track.segments:
             processed_segments += 1
             if on_progress:
-                on_progress(processed_segments, total_segments, 
+                on_progress(processed_segments, total_segments,
                           f"解析第 {processed_segments}/{total_segments} 个轨迹段...")
-            
+
             for point in segment.points:
                 if point.time and point.latitude is not None and point.longitude is not None:
                     # 将时间转换为naive datetime（去除时区信息，统一为UTC）
@@ -61,34 +199,12 @@ def parse_gpx(
                     else:
                         # 假设已经是UTC
                         t_utc = point.time
-                    
-                    track_points.append(TrackPoint(
-                        t_utc=t_utc,
-                        lat=point.latitude,
-                        lon=point.longitude
-                    ))
-    
-    if on_progress:
-        on_progress(total_segments, total_segments, "排序轨迹点...")
-    
-    # 按时间排序
-    track_points.sort(key=lambda p: p.t_utc)
-    
-    # 基础校验
-    if not track_points:
-        raise ValueError("GPX文件中没有找到有效的轨迹点（需要包含时间、经纬度信息）")
-    
-    # 检查时间是否递增（允许相同时间）
-    for i in range(1, len(track_points)):
-        if track_points[i].t_utc < track_points[i-1].t_utc:
-            # 时间不递增，重新排序已经修复，但仍然记录警告
-            pass
-    
-    if on_progress:
-        on_progress(len(track_points), len(track_points), 
-                   f"解析完成：共 {len(track_points)} 个轨迹点")
-    
-    return track_points
+
+                    times.append(t_utc)
+                    lats.append(point.latitude)
+                    lons.append(point.longitude)
+
+    return times, lats, lons
 
 
 def parse_csv(
@@ -97,8 +213,9 @@ def parse_csv(
     time_is_utc: bool = True,
     tz_offset: float = 0,
     time_format: str = 'auto',
-    on_progress: Optional[Callable[[int, int, str], None]] = None
-) -> List[TrackPoint]:
+    on_progress: Optional[Callable[[int, int, str], None]] = None,
+    return_soa: bool = False
+):
     """
     解析CSV文件
     
@@ -111,14 +228,18 @@ def parse_csv(
         tz_offset: 时区偏移（小时），例如+8表示东八区
         time_format: 时间格式，'auto'=自动检测，'timestamp'=Unix时间戳（秒），'iso'=ISO格式字符串
         on_progress: 进度回调函数 (done, total, message)，可选
-        
+        return_soa: 为True时返回TrackTable（列式数组），
+                    跳过逐点TrackPoint对象的构建
+
     Returns:
-        轨迹点列表（按时间排序）
+        轨迹点列表或TrackTable（均按时间排序）
         
     Raises:
         FileNotFoundError: 文件不存在
         ValueError: 文件格式错误或缺少必需列
     """
+    import pandas as pd
+
     path = Path(csv_path)
     if not path.exists():
         raise FileNotFoundError(f"CSV文件不存在: {csv_path}")
@@ -129,23 +250,28 @@ def parse_csv(
     if on_progress:
         on_progress(0, 0, "开始读取CSV文件...")
     
+    # 先只读表头检查必需的列，再带usecols读取全量数据，
+    # 避免解析报告里用不到的列
+    required_cols = [col_map['time'], col_map['lat'], col_map['lon']]
     try:
-        df = pd.read_csv(csv_path)
+        header_cols = list(pd.read_csv(csv_path, nrows=0).columns)
     except Exception as e:
         raise ValueError(f"CSV文件格式错误: {e}")
-    
-    # 检查必需的列
-    required_cols = [col_map['time'], col_map['lat'], col_map['lon']]
-    missing_cols = [col for col in required_cols if col not in df.columns]
+
+    missing_cols = [col for col in required_cols if col not in header_cols]
     if missing_cols:
-        available_cols = list(df.columns)
         raise ValueError(
             f"CSV文件缺少必需的列: {missing_cols}\n"
-            f"可用的列: {available_cols}\n"
+            f"可用的列: {header_cols}\n"
             f"提示：对于'一生足迹'app导出的CSV，请使用列映射: "
             f"{{'time': 'dataTime', 'lat': 'latitude', 'lon': 'longitude'}}"
         )
-    
+
+    try:
+        df = pd.read_csv(csv_path, usecols=required_cols)
+    except Exception as e:
+        raise ValueError(f"CSV文件格式错误: {e}")
+
     # 自动检测时间格式
     if time_format == 'auto':
         sample_time = str(df[col_map['time']].iloc[0])
@@ -155,53 +281,76 @@ def parse_csv(
         else:
             time_format = 'iso'
     
-    track_points = []
     total_rows = len(df)
-    
-    for idx, (_, row) in enumerate(df.iterrows(), 1):
-        if on_progress and idx % 10000 == 0:
-            on_progress(idx, total_rows, f"解析第 {idx}/{total_rows} 行...")
-        
+    if on_progress and total_rows:
+        on_progress(0, total_rows, f"解析 {total_rows} 行...")
+
+    # 整列向量化解析（时间解析和数值转换都在pandas的C层完成），
+    # 无法解析的值被置为NaT/NaN后整行跳过，与逐行try/except语义一致
+    if time_format == 'timestamp':
+        # Unix时间戳（秒）
+        times = pd.to_datetime(
+            pd.to_numeric(df[col_map['time']], errors='coerce'),
+            unit='s', utc=True, errors='coerce'
+        )
+    elif time_is_utc:
+        # ISO格式或其他字符串格式：utc=True下带时区的值正常转换，
+        # 无时区的值视为UTC，与逐行解析的语义一致
+        fmt = _detect_time_parse_format(df[col_map['time']])
+        times = pd.to_datetime(df[col_map['time']], errors='coerce', utc=True, format=fmt)
+    else:
+        # 无时区信息且不是UTC：先按原样解析，naive列整体按tz_offset平移
+        fmt = _detect_time_parse_format(df[col_map['time']])
         try:
-            # 解析时间
-            time_value = row[col_map['time']]
-            
-            if time_format == 'timestamp':
-                # Unix时间戳（秒）
-                timestamp = int(time_value)
-                dt = datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
-            else:
-                # ISO格式或其他字符串格式
-                time_str = str(time_value)
-                dt = date_parser.parse(time_str)
-                
-                # 如果解析出的时间有时区信息，转换为UTC
-                if dt.tzinfo is not None:
-                    dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
-                elif not time_is_utc:
-                    # 如果没有时区信息且不是UTC，根据tz_offset转换
-                    from datetime import timedelta
-                    tz = timezone(timedelta(hours=tz_offset))
-                    dt = dt.replace(tzinfo=tz)
-                    dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
-            
-            lat = float(row[col_map['lat']])
-            lon = float(row[col_map['lon']])
-            
-            track_points.append(TrackPoint(
-                t_utc=dt,
-                lat=lat,
-                lon=lon
-            ))
-        except Exception as e:
-            # 跳过无效行
-            continue
-    
+            times = pd.to_datetime(df[col_map['time']], errors='coerce', format=fmt)
+        except (ValueError, TypeError):
+            times = None
+        if times is not None and pd.api.types.is_datetime64_any_dtype(times):
+            if times.dt.tz is None:
+                times = times - pd.to_timedelta(tz_offset, unit='h')
+        else:
+            # 同一列混合多种时区偏移时pandas要求utc=True
+            times = pd.to_datetime(df[col_map['time']], errors='coerce', utc=True, format=fmt)
+
+    if times.dt.tz is not None:
+        # 带时区信息，统一转为naive UTC
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+
+    lats = pd.to_numeric(df[col_map['lat']], errors='coerce')
+    lons = pd.to_numeric(df[col_map['lon']], errors='coerce')
+
+    # 跳过无效行
+    valid = times.notna() & lats.notna() & lons.notna()
+
+    if return_soa:
+        # 直接从向量化结果构建列式数组（时间转纪元微秒也在C层完成），
+        # 不为每行分配TrackPoint实例
+        t_valid = times[valid]
+        if not len(t_valid):
+            raise ValueError("CSV文件中没有找到有效的轨迹点")
+        table = TrackTable.from_arrays(
+            t_valid.to_numpy(dtype='datetime64[us]').astype(np.int64),
+            lats[valid].to_numpy(dtype=np.float64),
+            lons[valid].to_numpy(dtype=np.float64)
+        )
+        if on_progress:
+            on_progress(total_rows, total_rows, f"解析完成：共 {len(table)} 个轨迹点")
+        return table
+
+    track_points = [
+        TrackPoint(t_utc=t, lat=la, lon=lo)
+        for t, la, lo in zip(
+            times[valid].dt.to_pydatetime(),
+            lats[valid].tolist(),
+            lons[valid].tolist()
+        )
+    ]
+
     if on_progress:
         on_progress(total_rows, total_rows, "排序轨迹点...")
     
     # 按时间排序
-    track_points.sort(key=lambda p: p.t_utc)
+    track_points.sort(key=_SORT_KEY)
     
     # 基础校验
     if not track_points:
@@ -2,50 +2,187 @@
 UI页面模块
 使用NiceGUI构建Web界面
 """
-from nicegui import ui, run
+from nicegui import app, ui, run
 from pathlib import Path
 import asyncio
 import os
+import platform
+import subprocess
+import threading
+import time
 from typing import Optional
 from .state import app_state
 from core.scan import scan_photos
-from core.match import match_photos_to_track
+from core.match import match_photos_to_track_iter
 from core.pipeline import process_pipeline
+from core.track import parse_gpx, parse_csv
+
+
+# 平台和对应的文件夹打开方式在导入时确定一次，点击时直接调用
+_SYS = platform.system()
+if _SYS == 'Windows':
+    _open_folder = os.startfile  # type: ignore[attr-defined]
+elif _SYS == 'Darwin':  # macOS
+    def _open_folder(path):
+        subprocess.run(['open', str(path)])
+else:  # Linux
+    def _open_folder(path):
+        subprocess.run(['xdg-open', str(path)])
+
+
+# 路径存在性检查的短期缓存：path -> (检查时刻, 结果)
+_exists_cache: dict = {}
+
+
+def _track_cache_key() -> Optional[tuple]:
+    """当前轨迹文件+解析参数的缓存键
+
+    路径、mtime和影响解析结果的参数任一变化都会使键失效；
+    文件不可访问时返回None（即视为不可缓存）。
+    """
+    try:
+        mtime = os.path.getmtime(app_state.track_path)
+    except (OSError, TypeError):
+        return None
+    if app_state.track_type == 'csv':
+        return (app_state.track_path, mtime, 'csv',
+                tuple(sorted(app_state.csv_col_map.items())),
+                app_state.csv_time_is_utc, app_state.csv_tz_offset)
+    return (app_state.track_path, mtime, 'gpx')
+
+
+async def _exists_cached(path: str, ttl: float = 2.0) -> bool:
+    """异步检查路径是否存在（带短期缓存）
+
+    stat在网络挂载或休眠硬盘上可能阻塞数秒，放到线程池里执行，
+    避免卡住事件循环；结果按路径缓存ttl秒，同一次操作里的
+    重复检查不再触发系统调用。用os.path.exists（C实现）而非
+    Path.exists，省去Path对象和stat_result的构造。
+    """
+    now = time.monotonic()
+    cached = _exists_cache.get(path)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    result = await run.io_bound(os.path.exists, path)
+    _exists_cache[path] = (time.monotonic(), result)
+    return result
+
+
+def _result_stat_card(label: str, value, color: str = ''):
+    """结果面板的单张统计卡片（标题+数值）"""
+    with ui.card().classes('flex-1'):
+        ui.label(label).classes('text-sm text-gray-600')
+        ui.label(str(value)).classes(f'text-2xl font-bold {color}'.rstrip())
+
+
+def _stat_cards(specs: list) -> list:
+    """构建一行统计卡片，返回数字标签的引用列表
+
+    卡片只建一次，之后给label.text赋值即可刷新，
+    免去每次结果更新时的组件销毁重建。
+
+    Args:
+        specs: (标签文字, 渐变背景样式或None)元组列表
+
+    Returns:
+        与specs等长的数字label列表
+    """
+    labels = []
+    for title, gradient in specs:
+        card = ui.card().classes('flex-1 stat-card')
+        if gradient:
+            card.style(f'background: {gradient}')
+        with card:
+            labels.append(ui.label('0').classes('stat-number'))
+            ui.label(title).classes('stat-label')
+    return labels
+
+
+def _fmt_dt(dt) -> str:
+    """拍摄时间列的显示格式化
+
+    isoformat是C实现且不用每次重新解析格式串，
+    输出与strftime('%Y-%m-%d %H:%M:%S')一致。
+    """
+    return dt.isoformat(sep=' ', timespec='seconds') if dt else ''
+
+
+def _paginated_table(columns: list, all_rows: list, row_key: str, sort_by: Optional[str] = None):
+    """创建服务端分页表格
+
+    全量行保存在Python侧，浏览器只收到当前页的数据；
+    翻页/排序通过Quasar的request事件回到服务端切片，
+    大结果集下初次渲染负载从O(N)降为每页行数。
+
+    Args:
+        columns: 列定义
+        all_rows: 全部行数据
+        row_key: 行主键字段名
+        sort_by: 初始排序字段，可选
+
+    Returns:
+        ui.table实例
+    """
+    rows_per_page = 10
+    pagination = {
+        'rowsPerPage': rows_per_page,
+        'page': 1,
+        'rowsNumber': len(all_rows),
+    }
+    if sort_by:
+        pagination['sortBy'] = sort_by
+
+    def page_slice(page: int, rpp: int, sort_key: Optional[str], descending: bool):
+        rows = all_rows
+        if sort_key:
+            rows = sorted(rows, key=lambda r: r.get(sort_key, ''), reverse=descending)
+        if rpp <= 0:
+            return rows
+        start = (page - 1) * rpp
+        return rows[start:start + rpp]
+
+    table = ui.table(
+        columns=columns,
+        rows=page_slice(1, rows_per_page, sort_by, False),
+        row_key=row_key,
+        pagination=pagination
+    ).classes('w-full')
+
+    def on_request(e):
+        p = dict(e.args['pagination'])
+        table.rows = page_slice(
+            p.get('page', 1),
+            p.get('rowsPerPage', rows_per_page),
+            p.get('sortBy'),
+            bool(p.get('descending'))
+        )
+        p['rowsNumber'] = len(all_rows)
+        table.pagination = p
+        table.update()
+
+    table.on('request', on_request)
+    return table
 
 
 def setup_ui():
     """设置UI界面"""
-    
-    # 自动保存配置的函数
+
+    # 启动时加载配置；加载完成后再开启自动保存，初始化赋值不触发写盘
+    app_state.load_from_config()
+    app_state._autosave_enabled = True
+
+
+    # 绑定到app_state属性的输入框由AppState.__setattr__自动安排
+    # 去抖保存；只有写入嵌套dict（如csv_col_map）的控件绕过了
+    # 属性赋值，需要手动触发一次
     def auto_save_config():
-        """自动保存配置到文件"""
-        app_state.save_to_config()
+        """触发一次去抖的配置保存"""
+        app_state.schedule_save()
     
-    # 页面样式
-    ui.add_head_html('''
-    <style>
-        .custom-card {
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }
-        .stat-card {
-            text-align: center;
-            padding: 15px;
-            border-radius: 8px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-        }
-        .stat-number {
-            font-size: 32px;
-            font-weight: bold;
-        }
-        .stat-label {
-            font-size: 14px;
-            opacity: 0.9;
-        }
-    </style>
-    ''')
+    # 页面样式：从静态文件引用，浏览器可缓存，
+    # 避免每次建页都内联传输同一段CSS
+    app.add_static_files('/static', str(Path(__file__).parent / 'static'))
+    ui.add_head_html('<link rel="stylesheet" href="/static/custom.css">')
     
     # 标题区域
     with ui.header().classes('items-center justify-between'):
@@ -92,7 +229,6 @@ def setup_ui():
                             value=app_state.folder_path
                         ).classes('flex-1')
                         folder_input.bind_value(app_state, 'folder_path')
-                        folder_input.on('blur', lambda: auto_save_config())
                         
                         def show_folder_help():
                             ui.notify('请在输入框中手动输入照片文件夹路径', type='info', position='top')
@@ -102,7 +238,6 @@ def setup_ui():
                     with ui.row():
                         recursive_switch = ui.checkbox('递归扫描子文件夹', value=app_state.recursive)
                         recursive_switch.bind_value(app_state, 'recursive')
-                        recursive_switch.on_value_change(lambda: auto_save_config())
                 
                 # 轨迹文件
                 with ui.column().classes('flex-1'):
@@ -114,7 +249,6 @@ def setup_ui():
                             value=app_state.track_path
                         ).classes('flex-1')
                         track_input.bind_value(app_state, 'track_path')
-                        track_input.on('blur', lambda: auto_save_config())
                         
                         def show_track_help():
                             ui.notify('请在输入框中手动输入轨迹文件路径（包含文件名）', type='info', position='top')
@@ -143,7 +277,6 @@ def setup_ui():
                         max=14
                     ).classes('w-full')
                     photo_tz_input.bind_value(app_state, 'photo_tz_offset')
-                    photo_tz_input.on('blur', lambda: auto_save_config())
                     
                     camera_offset_input = ui.number(
                         label='相机时间偏移（秒）',
@@ -151,7 +284,6 @@ def setup_ui():
                         step=1
                     ).classes('w-full')
                     camera_offset_input.bind_value(app_state, 'camera_offset_sec')
-                    camera_offset_input.on('blur', lambda: auto_save_config())
                 
                 # 右列
                 with ui.column().classes('flex-1'):
@@ -162,7 +294,6 @@ def setup_ui():
                         min=10
                     ).classes('w-full')
                     max_error_input.bind_value(app_state, 'max_error_sec')
-                    max_error_input.on('blur', lambda: auto_save_config())
                     
                     match_method_select = ui.select(
                         label='匹配模式',
@@ -173,7 +304,6 @@ def setup_ui():
                         value=app_state.match_method
                     ).classes('w-full')
                     match_method_select.bind_value(app_state, 'match_method')
-                    match_method_select.on_value_change(lambda: auto_save_config())
             
             # 距离过滤（仅插值模式）
             with ui.row().classes('w-full items-center gap-2 mt-2'):
@@ -191,7 +321,6 @@ def setup_ui():
                         app_state.max_distance_m = distance_input.value
                     else:
                         app_state.max_distance_m = None
-                    auto_save_config()
                 
                 distance_filter_switch.on_value_change(lambda: update_distance_filter())
                 distance_input.on('blur', lambda: update_distance_filter())
@@ -200,62 +329,60 @@ def setup_ui():
             with ui.row().classes('w-full'):
                 ui.label('提示：启用后，两个轨迹点间距离超过设定值时，将降级为最近点模式').classes('text-xs text-gray-600')
             
-            # CSV专用参数（动态显示）
+            # CSV专用参数（面板只构建一次，之后按轨迹类型切换可见性，
+            # 避免每次切换都销毁重建组件并通过websocket重新同步绑定）
             csv_params_container = ui.column().classes('w-full')
-            
+
+            with csv_params_container:
+                with ui.row().classes('w-full items-center gap-2'):
+                    ui.label('CSV列映射').classes('text-sm font-bold')
+                    ui.badge('当前: 一生足迹格式', color='green').classes('text-xs')
+
+                    def set_standard_format():
+                        ui.notify('已切换到标准格式', type='info')
+                        csv_time_col.value = 'time'
+                        csv_lat_col.value = 'lat'
+                        csv_lon_col.value = 'lon'
+                        auto_save_config()
+
+                    def set_yishengzuji_format():
+                        ui.notify('已切换到"一生足迹"格式', type='info')
+                        csv_time_col.value = 'dataTime'
+                        csv_lat_col.value = 'latitude'
+                        csv_lon_col.value = 'longitude'
+                        auto_save_config()
+
+                    ui.button('标准格式', icon='description', on_click=set_standard_format).props('flat dense').classes('text-xs')
+                    ui.button('一生足迹', icon='location_on', on_click=set_yishengzuji_format).props('flat dense').classes('text-xs')
+
+                with ui.row().classes('w-full gap-4'):
+                    csv_time_col = ui.input(
+                        label='时间列名',
+                        value=app_state.csv_col_map.get('time', 'dataTime')
+                    ).classes('flex-1')
+                    csv_time_col.bind_value(app_state.csv_col_map, 'time')
+                    csv_time_col.on('blur', lambda: auto_save_config())
+
+                    csv_lat_col = ui.input(
+                        label='纬度列名',
+                        value=app_state.csv_col_map.get('lat', 'latitude')
+                    ).classes('flex-1')
+                    csv_lat_col.bind_value(app_state.csv_col_map, 'lat')
+                    csv_lat_col.on('blur', lambda: auto_save_config())
+
+                    csv_lon_col = ui.input(
+                        label='经度列名',
+                        value=app_state.csv_col_map.get('lon', 'longitude')
+                    ).classes('flex-1')
+                    csv_lon_col.bind_value(app_state.csv_col_map, 'lon')
+                    csv_lon_col.on('blur', lambda: auto_save_config())
+
             def update_csv_params_visibility():
-                csv_params_container.clear()
-                if app_state.track_type == 'csv':
-                    with csv_params_container:
-                        with ui.row().classes('w-full items-center gap-2'):
-                            ui.label('CSV列映射').classes('text-sm font-bold')
-                            ui.badge('当前: 一生足迹格式', color='green').classes('text-xs')
-                            
-                            def set_standard_format():
-                                ui.notify('已切换到标准格式', type='info')
-                                app_state.csv_col_map['time'] = 'time'
-                                app_state.csv_col_map['lat'] = 'lat'
-                                app_state.csv_col_map['lon'] = 'lon'
-                                auto_save_config()
-                                update_csv_params_visibility()
-                            
-                            def set_yishengzuji_format():
-                                ui.notify('已切换到"一生足迹"格式', type='info')
-                                app_state.csv_col_map['time'] = 'dataTime'
-                                app_state.csv_col_map['lat'] = 'latitude'
-                                app_state.csv_col_map['lon'] = 'longitude'
-                                auto_save_config()
-                                update_csv_params_visibility()
-                            
-                            ui.button('标准格式', icon='description', on_click=set_standard_format).props('flat dense').classes('text-xs')
-                            ui.button('一生足迹', icon='location_on', on_click=set_yishengzuji_format).props('flat dense').classes('text-xs')
-                        
-                        with ui.row().classes('w-full gap-4'):
-                            csv_time_col = ui.input(
-                                label='时间列名',
-                                value=app_state.csv_col_map.get('time', 'dataTime')
-                            ).classes('flex-1')
-                            csv_time_col.bind_value(app_state.csv_col_map, 'time')
-                            csv_time_col.on('blur', lambda: auto_save_config())
-                            
-                            csv_lat_col = ui.input(
-                                label='纬度列名',
-                                value=app_state.csv_col_map.get('lat', 'latitude')
-                            ).classes('flex-1')
-                            csv_lat_col.bind_value(app_state.csv_col_map, 'lat')
-                            csv_lat_col.on('blur', lambda: auto_save_config())
-                            
-                            csv_lon_col = ui.input(
-                                label='经度列名',
-                                value=app_state.csv_col_map.get('lon', 'longitude')
-                            ).classes('flex-1')
-                            csv_lon_col.bind_value(app_state.csv_col_map, 'lon')
-                            csv_lon_col.on('blur', lambda: auto_save_config())
-            
+                csv_params_container.set_visibility(app_state.track_type == 'csv')
+
             def on_track_type_change():
-                auto_save_config()
                 update_csv_params_visibility()
-            
+
             track_type_select.on_value_change(lambda: on_track_type_change())
             update_csv_params_visibility()
         
@@ -269,6 +396,15 @@ def setup_ui():
             
             # 统计卡片容器
             scan_stats_container = ui.row().classes('w-full gap-4 mt-4')
+            with scan_stats_container:
+                scan_total_lbl, scan_gps_lbl, scan_need_lbl, scan_notime_lbl = _stat_cards([
+                    ('总照片数', None),
+                    ('已有GPS', 'linear-gradient(135deg, #11998e 0%, #38ef7d 100%)'),
+                    ('待处理', 'linear-gradient(135deg, #f093fb 0%, #f5576c 100%)'),
+                    ('无时间', 'linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)'),
+                ])
+            # 首次扫描前隐藏
+            scan_stats_container.set_visibility(False)
             
             # 照片列表容器
             scan_table_container = ui.column().classes('w-full mt-4')
@@ -284,7 +420,7 @@ def setup_ui():
                         ui.notify('请选择照片文件夹', type='warning')
                         return
                     
-                    if not Path(app_state.folder_path).exists():
+                    if not await _exists_cached(app_state.folder_path):
                         ui.notify('照片文件夹不存在', type='negative')
                         return
                     
@@ -302,67 +438,58 @@ def setup_ui():
                     
                     # 显示统计
                     summary = app_state.get_scan_summary()
-                    scan_stats_container.clear()
-                    with scan_stats_container:
-                        # 总照片数
-                        with ui.card().classes('flex-1 stat-card'):
-                            ui.label(str(summary['total'])).classes('stat-number')
-                            ui.label('总照片数').classes('stat-label')
-                        
-                        # 已有GPS
-                        with ui.card().classes('flex-1 stat-card').style('background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%)'):
-                            ui.label(str(summary['already_gps'])).classes('stat-number')
-                            ui.label('已有GPS').classes('stat-label')
-                        
-                        # 待处理
-                        with ui.card().classes('flex-1 stat-card').style('background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%)'):
-                            ui.label(str(summary['need_process'])).classes('stat-number')
-                            ui.label('待处理').classes('stat-label')
-                        
-                        # 无时间
-                        with ui.card().classes('flex-1 stat-card').style('background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)'):
-                            ui.label(str(summary['no_time'])).classes('stat-number')
-                            ui.label('无时间').classes('stat-label')
+                    # 卡片常驻，只更新数字文本
+                    scan_total_lbl.text = str(summary['total'])
+                    scan_gps_lbl.text = str(summary['already_gps'])
+                    scan_need_lbl.text = str(summary['need_process'])
+                    scan_notime_lbl.text = str(summary['no_time'])
+                    scan_stats_container.set_visibility(True)
                     
                     # 显示照片列表
                     scan_table_container.clear()
                     with scan_table_container:
                         if summary['total'] > 0:
                             # 创建表格数据
+                            # 状态只传数字编号，标签和颜色由浏览器端的
+                            # 列插槽映射，减小每行的传输体积
                             rows = []
                             for photo in already_gps:
                                 rows.append({
                                     'filename': Path(photo.path).name,
-                                    'datetime': photo.datetime_utc.strftime('%Y-%m-%d %H:%M:%S') if photo.datetime_utc else '',
-                                    'status': '已有GPS',
-                                    'status_color': 'green'
+                                    'datetime': _fmt_dt(photo.datetime_utc),
+                                    'status': 0
                                 })
                             for photo in need_process:
                                 rows.append({
                                     'filename': Path(photo.path).name,
-                                    'datetime': photo.datetime_utc.strftime('%Y-%m-%d %H:%M:%S') if photo.datetime_utc else '',
-                                    'status': '待处理',
-                                    'status_color': 'orange'
+                                    'datetime': _fmt_dt(photo.datetime_utc),
+                                    'status': 1
                                 })
                             for photo in no_time:
                                 rows.append({
                                     'filename': Path(photo.path).name,
                                     'datetime': '无时间',
-                                    'status': '无时间',
-                                    'status_color': 'gray'
+                                    'status': 2
                                 })
-                            
-                            ui.table(
+
+                            scan_table = _paginated_table(
                                 columns=[
                                     {'name': 'filename', 'label': '文件名', 'field': 'filename', 'align': 'left'},
                                     {'name': 'datetime', 'label': '拍摄时间（UTC）', 'field': 'datetime', 'align': 'left'},
                                     {'name': 'status', 'label': '状态', 'field': 'status', 'align': 'center'}
                                 ],
-                                rows=rows,
+                                all_rows=rows,
                                 row_key='filename',
-                                pagination={'rowsPerPage': 10, 'sortBy': 'filename'}
-                            ).classes('w-full')
-                    
+                                sort_by='filename'
+                            )
+                            scan_table.add_slot('body-cell-status', (
+                                '<q-td :props="props">'
+                                '<q-badge :color="[\'green\',\'orange\',\'grey\'][props.value]">'
+                                '{{ [\'已有GPS\',\'待处理\',\'无时间\'][props.value] }}'
+                                '</q-badge>'
+                                '</q-td>'
+                            ))
+
                     ui.notify(f'扫描完成：共 {summary["total"]} 张照片', type='positive')
                 
                 except Exception as e:
@@ -384,6 +511,15 @@ def setup_ui():
             
             # 匹配统计容器
             match_stats_container = ui.row().classes('w-full gap-4 mt-4')
+            with match_stats_container:
+                match_total_lbl, match_ok_lbl, match_fail_lbl, match_far_lbl = _stat_cards([
+                    ('待匹配照片', None),
+                    ('匹配成功', 'linear-gradient(135deg, #11998e 0%, #38ef7d 100%)'),
+                    ('匹配失败', 'linear-gradient(135deg, #f093fb 0%, #f5576c 100%)'),
+                    ('超阈值', 'linear-gradient(135deg, #fa709a 0%, #fee140 100%)'),
+                ])
+            # 首次匹配前隐藏
+            match_stats_container.set_visibility(False)
             
             # 匹配结果表格容器
             match_table_container = ui.column().classes('w-full mt-4')
@@ -403,101 +539,126 @@ def setup_ui():
                         ui.notify('请选择轨迹文件', type='warning')
                         return
                     
-                    if not Path(app_state.track_path).exists():
+                    if not await _exists_cached(app_state.track_path):
                         ui.notify('轨迹文件不存在', type='negative')
                         return
                     
-                    # 解析轨迹
-                    ui.notify('正在解析轨迹文件...', type='info')
-                    
-                    if app_state.track_type == 'gpx':
-                        from core.track import parse_gpx
-                        track_points = await run.io_bound(
-                            parse_gpx,
-                            app_state.track_path
-                        )
-                    else:  # csv
-                        from core.track import parse_csv
-                        track_points = await run.io_bound(
-                            parse_csv,
-                            app_state.track_path,
-                            app_state.csv_col_map,
-                            app_state.csv_time_is_utc,
-                            app_state.csv_tz_offset
-                        )
-                    
+                    # 解析轨迹（同一文件+参数组合只解析一次，列式结果缓存复用）
+                    track_key = _track_cache_key()
+                    if track_key is not None and track_key == app_state.track_table_key:
+                        track_points = app_state.track_table
+                    else:
+                        ui.notify('正在解析轨迹文件...', type='info')
+
+                        if app_state.track_type == 'gpx':
+                            track_points = await run.io_bound(
+                                parse_gpx,
+                                app_state.track_path,
+                                return_soa=True
+                            )
+                        else:  # csv
+                            track_points = await run.io_bound(
+                                parse_csv,
+                                app_state.track_path,
+                                app_state.csv_col_map,
+                                app_state.csv_time_is_utc,
+                                app_state.csv_tz_offset,
+                                return_soa=True
+                            )
+                        app_state.track_table = track_points
+                        app_state.track_table_key = track_key
+
                     ui.notify(f'轨迹解析完成：共 {len(track_points)} 个轨迹点', type='info')
                     
-                    # 执行匹配
-                    match_results = await run.io_bound(
-                        match_photos_to_track,
-                        app_state.need_process,
-                        track_points,
-                        app_state.photo_tz_offset,
-                        app_state.camera_offset_sec,
-                        app_state.max_error_sec,
-                        app_state.match_method
-                    )
-                    
-                    # 更新状态
-                    app_state.match_results = match_results
-                    
-                    # 显示统计
-                    summary = app_state.get_match_summary()
-                    match_stats_container.clear()
-                    with match_stats_container:
-                        # 总数
-                        with ui.card().classes('flex-1 stat-card'):
-                            ui.label(str(summary['total'])).classes('stat-number')
-                            ui.label('待匹配照片').classes('stat-label')
-                        
-                        # 匹配成功
-                        with ui.card().classes('flex-1 stat-card').style('background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%)'):
-                            ui.label(str(summary['matched'])).classes('stat-number')
-                            ui.label('匹配成功').classes('stat-label')
-                        
-                        # 匹配失败
-                        with ui.card().classes('flex-1 stat-card').style('background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%)'):
-                            ui.label(str(summary['unmatched'])).classes('stat-number')
-                            ui.label('匹配失败').classes('stat-label')
-                        
-                        # 超阈值
-                        with ui.card().classes('flex-1 stat-card').style('background: linear-gradient(135deg, #fa709a 0%, #fee140 100%)'):
-                            ui.label(str(summary['too_far'])).classes('stat-number')
-                            ui.label('超阈值').classes('stat-label')
-                    
-                    # 显示匹配结果表格
+                    # 流式匹配：后台线程跑匹配迭代器（重计算已在numpy的
+                    # C层完成，不与事件循环争抢GIL），每100条推送一批，
+                    # 首批结果立即可见，不必等全量匹配完成
+                    # 按路径一次建表，循环内O(1)查找，
+                    # 避免每行线性扫描need_process（O(N·M)）；
+                    # 键做normcase+normpath归一，Windows下分隔符或
+                    # 大小写不一致的路径不会悄悄查不到（表现为时间列空白）
+                    def norm(p: str) -> str:
+                        return os.path.normcase(os.path.normpath(p))
+
+                    photo_by_path = {norm(p.path): p for p in app_state.need_process}
+
                     match_table_container.clear()
+                    all_rows = []
                     with match_table_container:
-                        if match_results:
-                            rows = []
-                            for match in match_results:
-                                photo_name = Path(match.photo_path).name
-                                photo = next((p for p in app_state.need_process if p.path == match.photo_path), None)
-                                rows.append({
-                                    'filename': photo_name,
-                                    'datetime': photo.datetime_utc.strftime('%Y-%m-%d %H:%M:%S') if photo and photo.datetime_utc else '',
-                                    'status': '✓ 匹配成功' if match.status == 'matched' else '✗ 匹配失败',
-                                    'error_sec': f'{match.error_sec:.1f}' if match.error_sec is not None else '',
-                                    'lat': f'{match.lat:.6f}' if match.lat is not None else '',
-                                    'lon': f'{match.lon:.6f}' if match.lon is not None else '',
-                                    'reason': match.reason or ''
-                                })
-                            
-                            ui.table(
-                                columns=[
-                                    {'name': 'filename', 'label': '文件名', 'field': 'filename', 'align': 'left'},
-                                    {'name': 'datetime', 'label': '拍摄时间（UTC）', 'field': 'datetime', 'align': 'left'},
-                                    {'name': 'status', 'label': '状态', 'field': 'status', 'align': 'center'},
-                                    {'name': 'error_sec', 'label': '误差（秒）', 'field': 'error_sec', 'align': 'right'},
-                                    {'name': 'lat', 'label': '纬度', 'field': 'lat', 'align': 'right'},
-                                    {'name': 'lon', 'label': '经度', 'field': 'lon', 'align': 'right'},
-                                    {'name': 'reason', 'label': '说明', 'field': 'reason', 'align': 'left'}
-                                ],
-                                rows=rows,
-                                row_key='filename',
-                                pagination={'rowsPerPage': 10}
-                            ).classes('w-full')
+                        match_table = _paginated_table(
+                            columns=[
+                                {'name': 'filename', 'label': '文件名', 'field': 'filename', 'align': 'left'},
+                                {'name': 'datetime', 'label': '拍摄时间（UTC）', 'field': 'datetime', 'align': 'left'},
+                                {'name': 'status', 'label': '状态', 'field': 'status', 'align': 'center'},
+                                {'name': 'error_sec', 'label': '误差（秒）', 'field': 'error_sec', 'align': 'right'},
+                                {'name': 'lat', 'label': '纬度', 'field': 'lat', 'align': 'right'},
+                                {'name': 'lon', 'label': '经度', 'field': 'lon', 'align': 'right'},
+                                {'name': 'reason', 'label': '说明', 'field': 'reason', 'align': 'left'}
+                            ],
+                            all_rows=all_rows,
+                            row_key='filename'
+                        )
+
+                    loop = asyncio.get_running_loop()
+                    queue: asyncio.Queue = asyncio.Queue()
+
+                    def produce_matches():
+                        """后台线程：跑匹配迭代器，分批回传事件循环"""
+                        batch = []
+                        try:
+                            for item in match_photos_to_track_iter(
+                                    app_state.need_process,
+                                    track_points,
+                                    app_state.photo_tz_offset,
+                                    app_state.camera_offset_sec,
+                                    app_state.max_error_sec,
+                                    app_state.match_method):
+                                batch.append(item)
+                                if len(batch) >= 100:
+                                    loop.call_soon_threadsafe(queue.put_nowait, batch)
+                                    batch = []
+                            if batch:
+                                loop.call_soon_threadsafe(queue.put_nowait, batch)
+                            loop.call_soon_threadsafe(queue.put_nowait, None)
+                        except Exception as exc:
+                            loop.call_soon_threadsafe(queue.put_nowait, exc)
+
+                    threading.Thread(target=produce_matches, daemon=True).start()
+
+                    # 结果逐批灌入app_state，状态计数随追加增量维护
+                    app_state.reset_match_results()
+                    while True:
+                        batch = await queue.get()
+                        if batch is None:
+                            break
+                        if isinstance(batch, Exception):
+                            raise batch
+                        for match in batch:
+                            app_state.add_match_result(match)
+                            # 文件名在匹配阶段已推导好，直接取用
+                            photo = photo_by_path.get(norm(match.photo_path))
+                            all_rows.append({
+                                'filename': match.photo_name,
+                                'datetime': _fmt_dt(photo.datetime_utc) if photo else '',
+                                'status': '✓ 匹配成功' if match.status == 'matched' else '✗ 匹配失败',
+                                'error_sec': f'{match.error_sec:.1f}' if match.error_sec is not None else '',
+                                'lat': f'{match.lat:.6f}' if match.lat is not None else '',
+                                'lon': f'{match.lon:.6f}' if match.lon is not None else '',
+                                'reason': match.reason or ''
+                            })
+                        # 刷新总行数和当前首页（翻页/排序仍走服务端分页）
+                        match_table.rows = all_rows[:10]
+                        match_table.pagination = {**match_table.pagination, 'rowsNumber': len(all_rows)}
+                        match_table.update()
+
+                    # 显示统计
+                    summary = app_state.get_match_summary()
+                    # 卡片常驻，只更新数字文本
+                    match_total_lbl.text = str(summary['total'])
+                    match_ok_lbl.text = str(summary['matched'])
+                    match_fail_lbl.text = str(summary['unmatched'])
+                    match_far_lbl.text = str(summary['too_far'])
+                    match_stats_container.set_visibility(True)
                     
                     ui.notify(f'匹配完成：{summary["matched"]}/{summary["total"]} 张照片匹配成功', type='positive')
                 
@@ -540,7 +701,6 @@ def setup_ui():
                                 placeholder='处理后的照片保存目录'
                             ).classes('flex-1')
                             output_dir_input.bind_value(app_state, 'output_dir')
-                            output_dir_input.on('blur', lambda: auto_save_config())
                             
                             def show_output_help():
                                 ui.notify('请在输入框中手动输入输出目录路径', type='info', position='top')
@@ -551,7 +711,6 @@ def setup_ui():
                         ui.label('⚠️ 注意：将直接修改原照片文件，请确保已备份！').classes('text-orange font-bold')
             
             def on_output_mode_change():
-                auto_save_config()
                 update_output_dir_visibility()
             
             output_mode_group.on_value_change(lambda: on_output_mode_change())
@@ -561,7 +720,6 @@ def setup_ui():
             with ui.row().classes('w-full items-center gap-2 mt-2'):
                 report_switch = ui.checkbox('生成处理报告（CSV格式）', value=app_state.generate_report)
                 report_switch.bind_value(app_state, 'generate_report')
-                report_switch.on_value_change(lambda: auto_save_config())
                 ui.label('报告包含所有照片的处理状态、匹配结果等详细信息').classes('text-sm text-gray-600')
             
             # 开始处理按钮
@@ -585,11 +743,11 @@ def setup_ui():
                 
                 try:
                     # 验证输入
-                    if not app_state.folder_path or not Path(app_state.folder_path).exists():
+                    if not app_state.folder_path or not await _exists_cached(app_state.folder_path):
                         ui.notify('请选择有效的照片文件夹', type='negative')
                         return
                     
-                    if not app_state.track_path or not Path(app_state.track_path).exists():
+                    if not app_state.track_path or not await _exists_cached(app_state.track_path):
                         ui.notify('请选择有效的轨迹文件', type='negative')
                         return
                     
@@ -598,25 +756,42 @@ def setup_ui():
                         progress_label = ui.label('准备开始处理...').classes('text-sm')
                         progress_bar = ui.linear_progress(value=0, show_value=False).classes('w-full')
                     
+                    phase_names = {
+                        'scanning': '📷 扫描照片',
+                        'parsing_track': '🗺️ 解析轨迹',
+                        'matching': '🎯 匹配坐标',
+                        'writing': '💾 写入GPS',
+                        'reporting': '📊 生成报告'
+                    }
+
+                    # UI推送限流在约30Hz：状态字段每次都更新，
+                    # 但websocket帧最多每33ms一帧（阶段完成时强制刷新）
+                    last_push = [0.0]
+
                     # 进度回调
                     def on_progress(phase: str, done: int, total: int, message: str):
                         app_state.task_phase = phase
                         app_state.task_progress = done / total if total > 0 else 0
                         app_state.task_message = message
-                        
+
+                        now = time.monotonic()
+                        if now - last_push[0] < 0.033 and done != total:
+                            return
+                        last_push[0] = now
+
                         # 更新UI
-                        phase_names = {
-                            'scanning': '📷 扫描照片',
-                            'parsing_track': '🗺️ 解析轨迹',
-                            'matching': '🎯 匹配坐标',
-                            'writing': '💾 写入GPS',
-                            'reporting': '📊 生成报告'
-                        }
                         phase_name = phase_names.get(phase, phase)
                         progress_label.text = f'{phase_name}: {message}'
                         progress_bar.value = app_state.task_progress
                     
-                    # 执行流水线
+                    # 执行流水线（保持io_bound：进度回调闭包无法跨进程pickle，
+                    # 且扫描/写入阶段以文件I/O为主，线程池即可让事件循环保持响应）
+                    # 匹配预览解析过且轨迹未变时，流水线直接复用缓存的轨迹表
+                    track_key = _track_cache_key()
+                    cached_track = (app_state.track_table
+                                    if track_key is not None and track_key == app_state.track_table_key
+                                    else None)
+
                     summary = await run.io_bound(
                         process_pipeline,
                         app_state.folder_path,
@@ -634,7 +809,8 @@ def setup_ui():
                         app_state.csv_col_map if app_state.track_type == 'csv' else None,
                         app_state.csv_time_is_utc if app_state.track_type == 'csv' else True,
                         app_state.csv_tz_offset if app_state.track_type == 'csv' else 0.0,
-                        on_progress
+                        on_progress,
+                        cached_track
                     )
                     
                     # 显示结果
@@ -644,25 +820,15 @@ def setup_ui():
                         
                         # 统计信息
                         with ui.row().classes('w-full gap-4 mt-2'):
-                            with ui.card().classes('flex-1'):
-                                ui.label('总照片数').classes('text-sm text-gray-600')
-                                ui.label(str(summary['total'])).classes('text-2xl font-bold')
-                            
-                            with ui.card().classes('flex-1'):
-                                ui.label('匹配成功').classes('text-sm text-gray-600')
-                                ui.label(str(summary['matched'])).classes('text-2xl font-bold text-green')
-                            
-                            with ui.card().classes('flex-1'):
-                                ui.label('写入成功').classes('text-sm text-gray-600')
-                                ui.label(str(summary['write_success'])).classes('text-2xl font-bold text-blue')
-                            
-                            with ui.card().classes('flex-1'):
-                                ui.label('写入失败').classes('text-sm text-gray-600')
-                                ui.label(str(summary['write_failed'])).classes('text-2xl font-bold text-red')
+                            _result_stat_card('总照片数', summary['total'])
+                            _result_stat_card('匹配成功', summary['matched'], 'text-green')
+                            _result_stat_card('写入成功', summary['write_success'], 'text-blue')
+                            _result_stat_card('写入失败', summary['write_failed'], 'text-red')
                         
-                        # 输出路径信息
+                        # 输出路径信息（绝对路径解析一次，展示和打开共用）
+                        output_abs = Path(summary['output_dir']).absolute()
                         ui.separator()
-                        ui.label(f"📁 输出目录：{summary['output_dir']}").classes('text-sm')
+                        ui.label(f"📁 输出目录：{output_abs}").classes('text-sm')
                         if summary.get('report_path'):
                             ui.label(f"📊 报告文件：{summary['report_path']}").classes('text-sm')
                         else:
@@ -670,20 +836,17 @@ def setup_ui():
                         
                         # 打开文件夹按钮
                         def open_output_folder():
-                            import subprocess
-                            import platform
-                            output_path = Path(summary['output_dir']).absolute()
-                            if platform.system() == 'Windows':
-                                os.startfile(output_path)
-                            elif platform.system() == 'Darwin':  # macOS
-                                subprocess.run(['open', output_path])
-                            else:  # Linux
-                                subprocess.run(['xdg-open', output_path])
-                        
+                            _open_folder(output_abs)
+
                         ui.button('打开输出文件夹', icon='folder_open', on_click=open_output_folder).classes('mt-2')
                     
+                    # 汇总卡片展示完毕后及时释放匹配预览的逐项结果：
+                    # 明细已随报告落盘，大批量照片时这是数十MB的对象内存。
+                    # 扫描分类列表保留，重复匹配无需重新扫描
+                    app_state.reset_match_results()
+
                     ui.notify('处理完成！', type='positive')
-                
+
                 except Exception as e:
                     result_container.clear()
                     with result_container:
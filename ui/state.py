@@ -2,14 +2,27 @@
 UI状态管理模块
 维护全局应用状态
 """
+import threading
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict
 from pathlib import Path
-from core.models import PhotoItem, MatchItem
+from core.models import PhotoItem, MatchItem, TrackTable
 from core.config import config_manager
 
 
-@dataclass
+# 需要写回配置文件的字段（与save_to_config的键保持一致）。
+# 这些属性被赋值时自动安排一次去抖保存，bind_value的写回
+# 直接走属性赋值，各输入框无需再逐个挂blur/change回调。
+_PERSISTED_FIELDS = frozenset({
+    'folder_path', 'track_path', 'track_type',
+    'output_dir', 'output_mode', 'generate_report',
+    'photo_tz_offset', 'camera_offset_sec', 'max_error_sec',
+    'match_method', 'max_distance_m', 'recursive',
+    'csv_col_map', 'csv_time_is_utc', 'csv_tz_offset',
+})
+
+
+@dataclass(slots=True)
 class AppState:
     """应用全局状态"""
     # 文件路径
@@ -41,6 +54,11 @@ class AppState:
     
     # 匹配结果
     match_results: List[MatchItem] = field(default_factory=list)
+
+    # 轨迹解析缓存：TrackTable及其来源键（路径、mtime、解析参数），
+    # 匹配预览与处理流水线共用，轨迹未变时免去重复解析
+    track_table: Optional[TrackTable] = field(default=None, init=False, repr=False)
+    track_table_key: Optional[tuple] = field(default=None, init=False, repr=False)
     
     # 输出设置
     output_dir: str = 'output'
@@ -52,7 +70,40 @@ class AppState:
     task_phase: Optional[str] = None  # 'scanning' | 'parsing_track' | 'matching' | 'writing' | 'reporting'
     task_progress: float = 0.0  # 0.0 - 1.0
     task_message: str = ''
+
+    # 内部簿记（slots下没有__dict__，需显式声明；不参与初始化）
+    _autosave_enabled: bool = field(default=False, init=False, repr=False)
+    _save_timer: Optional[threading.Timer] = field(default=None, init=False, repr=False)
+    _match_counts: Optional[dict] = field(default=None, init=False, repr=False)
+    _last_saved_hash: Optional[int] = field(default=None, init=False, repr=False)
     
+    def __setattr__(self, name, value):
+        """属性写入钩子：持久化字段被修改时安排一次去抖保存
+
+        初始化和load_from_config期间_autosave_enabled尚未置位，
+        不会触发写盘。
+        """
+        object.__setattr__(self, name, value)
+        if name == 'match_results':
+            # 整表替换时作废状态计数缓存，下次查询时重建一次
+            object.__setattr__(self, '_match_counts', None)
+        if name in _PERSISTED_FIELDS and getattr(self, '_autosave_enabled', False):
+            self.schedule_save()
+
+    def schedule_save(self, delay: float = 0.5):
+        """安排一次延迟保存，新的修改会重置计时器
+
+        连续的表单修改合并为一次save_to_config，不再每次
+        都同步序列化整份配置。
+        """
+        timer = getattr(self, '_save_timer', None)
+        if timer is not None:
+            timer.cancel()
+        timer = threading.Timer(delay, self.save_to_config)
+        timer.daemon = True
+        object.__setattr__(self, '_save_timer', timer)
+        timer.start()
+
     def reset_scan_results(self):
         """重置扫描结果"""
         self.already_gps = []
@@ -72,14 +123,32 @@ class AppState:
             'no_time': len(self.no_time)
         }
     
+    def add_match_result(self, m: MatchItem):
+        """追加一条匹配结果并同步更新状态计数
+
+        流式匹配逐批灌入结果时，摘要查询保持O(1)，
+        不必每次都重扫整个结果列表。
+        """
+        self.match_results.append(m)
+        counts = self._match_counts
+        if counts is not None:
+            counts[m.status] = counts.get(m.status, 0) + 1
+
     def get_match_summary(self) -> dict:
-        """获取匹配结果摘要"""
-        matched = sum(1 for m in self.match_results if m.status == 'matched')
-        unmatched = sum(1 for m in self.match_results if m.status in ['unmatched', 'too_far'])
-        too_far = sum(1 for m in self.match_results if m.status == 'too_far')
+        """获取匹配结果摘要（状态计数有缓存，通常O(1)）"""
+        counts = self._match_counts
+        if counts is None:
+            # 整表替换后首次查询：单次遍历重建计数
+            counts = {}
+            for m in self.match_results:
+                s = m.status
+                counts[s] = counts.get(s, 0) + 1
+            object.__setattr__(self, '_match_counts', counts)
+        too_far = counts.get('too_far', 0)
         return {
-            'matched': matched,
-            'unmatched': unmatched,
+            'matched': counts.get('matched', 0),
+            # 口径保持不变：unmatched包含too_far
+            'unmatched': counts.get('unmatched', 0) + too_far,
             'too_far': too_far,
             'total': len(self.match_results)
         }
@@ -133,12 +202,16 @@ class AppState:
             'csv_time_is_utc': self.csv_time_is_utc,
             'csv_tz_offset': self.csv_tz_offset,
         }
+        # 内容与上次落盘一致时直接跳过，省去序列化和磁盘写入
+        # （例如输入框失焦但值未变、或去抖窗口里改回了原值）
+        content_hash = hash(tuple(sorted((k, repr(v)) for k, v in config.items())))
+        if content_hash == self._last_saved_hash:
+            return
+        self._last_saved_hash = content_hash
         config_manager.save(config)
 
 
 # 全局状态实例
+# （配置加载推迟到UI启动入口，导入本模块不触发磁盘读取）
 app_state = AppState()
 
-# 启动时加载配置
-app_state.load_from_config()
-